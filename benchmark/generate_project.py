@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2017 Olzhas Rakhimov
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Generator of synthetic C/C++ projects with their cppdep configuration.
+
+The components are ordered across all the packages,
+and each component includes the headers of the following components
+(the nearby ones more likely as in layered software).
+Back includes to the preceding components introduce cycles.
+
+    $ python benchmark/generate_project.py /tmp/project --packages 100
+"""
+
+from __future__ import print_function, absolute_import, division
+
+import argparse as ap
+import os
+import random
+
+STD_HEADERS = ('vector', 'map', 'string', 'memory', 'algorithm')
+
+
+def add_arguments(parser):
+    """Adds the generator parameters to the argument parser."""
+    parser.add_argument('--groups', type=int, default=2,
+                        help='the number of internal package groups')
+    parser.add_argument('--packages', type=int, default=10,
+                        help='the number of packages per group')
+    parser.add_argument('--components', type=int, default=20,
+                        help='the number of components per package')
+    parser.add_argument('--fan-out', type=int, default=5,
+                        help='the average number of internal includes')
+    parser.add_argument('--cycle-density', type=float, default=0.05,
+                        help='the probability of a back include per component')
+    parser.add_argument('--header-only', type=float, default=0.2,
+                        help='the fraction of header-only components')
+    parser.add_argument('--externals', type=int, default=2,
+                        help='the number of external packages')
+    parser.add_argument('--seed', type=int, default=42)
+
+
+def parameters(args):
+    """Returns the generator parameters from the parsed arguments."""
+    return dict(num_groups=args.groups, num_packages=args.packages,
+                num_components=args.components, fan_out=args.fan_out,
+                cycle_density=args.cycle_density,
+                header_only=args.header_only, num_externals=args.externals,
+                seed=args.seed)
+
+
+def write_file(file_path, lines):
+    """Writes the lines into a new file creating its directory."""
+    dir_path = os.path.dirname(file_path)
+    if not os.path.isdir(dir_path):
+        os.makedirs(dir_path)
+    with open(file_path, 'w') as src_file:
+        src_file.write('\n'.join(lines) + '\n')
+
+
+def generate(root, num_groups=2, num_packages=10, num_components=20,
+             fan_out=5, cycle_density=0.05, header_only=0.2, num_externals=2,
+             seed=42):
+    """Writes a synthetic project and its .cppdep.yml configuration.
+
+    Args:
+        root: The directory to write the project into.
+        num_groups: The number of internal package groups.
+        num_packages: The number of packages per group.
+        num_components: The number of components per package.
+        fan_out: The average number of internal includes per component.
+        cycle_density: The probability of a back include per component.
+        header_only: The fraction of components without implementation files.
+        num_externals: The number of external packages with headers.
+        seed: The seed of the random generator.
+
+    Returns:
+        The path to the configuration file.
+    """
+    rng = random.Random(seed)
+    # [(group, package, component)] in the include order.
+    components = [('g%d' % g, 'p%d' % (g * num_packages + p), 'c%d' % c)
+                  for g in range(num_groups) for p in range(num_packages)
+                  for c in range(num_components)]
+    num_headers = 10  # The number of headers per external package.
+    for e in range(num_externals):
+        for h in range(num_headers):
+            write_file(os.path.join(root, 'ext', 'e%d' % e, 'include',
+                                    'e%d' % e, 'h%d.h' % h), ['#pragma once'])
+
+    def _header(index):
+        return '"%s/%s.h"' % components[index][1:]
+
+    for i, (group, package, component) in enumerate(components):
+        window = min(len(components) - i - 1, 10 * fan_out)
+        includes = [
+            _header(i + 1 + int(window * rng.random()**2))
+            for _ in range(rng.randint(0, 2 * fan_out) if window else 0)
+        ]
+        if i and rng.random() < cycle_density:
+            includes.append(_header(rng.randrange(i)))
+        includes.append('<%s>' % rng.choice(STD_HEADERS))
+        if num_externals:
+            includes.append('<e%d/h%d.h>' % (rng.randrange(num_externals),
+                                             rng.randrange(num_headers)))
+        includes = sorted(set(includes))
+        path = os.path.join(root, 'src', group, package, component)
+        code = ['', 'namespace %s {' % package,
+                'int %s(int x);' % component, '}  // namespace %s' % package]
+        if rng.random() < header_only:
+            write_file(path + '.h', ['#pragma once'] +
+                       ['#include %s' % x for x in includes] + code)
+            continue
+        num_header_includes = rng.randint(0, len(includes))
+        write_file(path + '.h', ['#pragma once'] + [
+            '#include %s' % x for x in includes[:num_header_includes]
+        ] + code)
+        write_file(path + '.cc', ['#include %s' % _header(i)] + [
+            '#include %s' % x for x in includes[num_header_includes:]
+        ] + code)
+
+    config = ['internal:']
+    for g in range(num_groups):
+        config.extend(['  - name: g%d' % g, '    path: src/g%d' % g,
+                       '    packages:'])
+        for p in range(g * num_packages, (g + 1) * num_packages):
+            config.extend(['      - name: p%d' % p, '        src: [p%d]' % p,
+                           '        include: [.]'])
+    config.extend(['external:', '  - name: ext', '    path: ext',
+                   '    packages:', '      - name: std',
+                   '        pattern: [%s]' % ', '.join(STD_HEADERS)])
+    for e in range(num_externals):
+        config.extend(['      - name: e%d' % e,
+                       '        include: [e%d/include]' % e])
+    config_path = os.path.join(root, '.cppdep.yml')
+    write_file(config_path, config)
+    return config_path
+
+
+def main():
+    """Generates a project into the directory."""
+    parser = ap.ArgumentParser(description=__doc__)
+    parser.add_argument('root', help='the directory to generate the project')
+    add_arguments(parser)
+    args = parser.parse_args()
+    print(generate(args.root, **parameters(args)))
+
+
+if __name__ == '__main__':
+    main()
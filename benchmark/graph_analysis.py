@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2017 Olzhas Rakhimov
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Scaling benchmark of the graph analysis on random acyclic graphs.
+
+The transitive reduction is compared
+against the reference reduction with depth-first searches.
+
+    $ python benchmark/graph_analysis.py --nodes 1000 4000 16000
+"""
+
+from __future__ import print_function, absolute_import, division
+
+import argparse as ap
+import os
+import random
+import sys
+import time
+
+import networkx as nx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cppdep import graph  # pylint: disable=wrong-import-position
+
+
+def random_dag(num_nodes, out_degree, seed=42):
+    """Generates a random acyclic dependency graph.
+
+    The dependencies are biased towards the nearby nodes
+    in the topological order (as in layered software).
+    """
+    rng = random.Random(seed)
+    edges = []
+    for u in range(num_nodes - 1):
+        for _ in range(rng.randint(0, 2 * out_degree)):
+            window = min(num_nodes - u - 1, 10 * out_degree)
+            edges.append((u, u + 1 + int(window * rng.random()**2)))
+    return edges
+
+
+class Node(int):
+    """Integer graph node with dependencies."""
+
+    def dependencies(self):
+        """Returns the dependency nodes."""
+        return self.deps
+
+
+def make_nodes(num_nodes, edges):
+    """Returns integer nodes with dependencies from the edges."""
+    nodes = [Node(x) for x in range(num_nodes)]
+    for node in nodes:
+        node.deps = []
+    for u, v in edges:
+        nodes[u].deps.append(nodes[v])
+    return nodes
+
+
+def chain(num_nodes):
+    """Generates a dependency chain."""
+    return [(u, u + 1) for u in range(num_nodes - 1)]
+
+
+def fan_out(num_nodes, width=1000):
+    """Generates layers of nodes depending on all nodes of the next layer."""
+    return [(u, v)
+            for layer in range(0, num_nodes - width, width)
+            for u in range(layer, layer + width, width // 10)
+            for v in range(layer + width, min(layer + 2 * width, num_nodes))]
+
+
+def reference_reduction(digraph):
+    """The transitive reduction with a depth-first search per edge."""
+    for u in digraph:
+        transitive_vertex = []
+        for v in digraph[u]:
+            transitive_vertex.extend(x for _, x in nx.dfs_edges(digraph, v))
+        digraph.remove_edges_from((u, x) for x in transitive_vertex)
+
+
+def timed(function, *args):
+    """Returns the wall time of the function call in seconds."""
+    start = time.time()
+    function(*args)
+    return time.time() - start
+
+
+def main():
+    """Runs the benchmark on graphs of increasing sizes."""
+    parser = ap.ArgumentParser(description=__doc__)
+    parser.add_argument('--nodes', type=int, nargs='+',
+                        default=[1000, 4000, 16000, 32000])
+    parser.add_argument('--degree', type=int, default=4)
+    parser.add_argument('--reference-limit', type=int, default=1000,
+                        help='the largest graph for the reference reduction')
+    parser.add_argument('--levels-nodes', type=int, default=1000000,
+                        help='the size of graphs for the levelization')
+    args = parser.parse_args()
+    print('%8s %8s %12s %12s %10s %10s %10s' %
+          ('nodes', 'edges', 'construction', 'condensation', 'reduction',
+           'reference', 'ccd'))
+    for num_nodes in args.nodes:
+        edges = random_dag(num_nodes, args.degree)
+        nodes = make_nodes(num_nodes, edges)
+        start = time.time()
+        dependency_graph = graph.Graph(nodes)
+        construction_time = time.time() - start
+        # pylint: disable=protected-access
+        start = time.time()
+        position, condensed_nodes, offsets, targets = (
+            dependency_graph._Graph__condensation())
+        condensation_time = time.time() - start
+        start = time.time()
+        offsets, targets = dependency_graph._Graph__transitive_reduction(
+            position, offsets, targets)
+        reduction_time = time.time() - start
+        reference_time = '-'
+        if num_nodes <= args.reference_limit:
+            reference = nx.DiGraph(edges)
+            reference_time = '%.3fs' % timed(reference_reduction, reference)
+            assert (set(reference.edges()) == set(
+                dependency_graph.edges())), 'Reduction mismatch!'
+        ccd_time = timed(dependency_graph._Graph__calculate_ccd,
+                         condensed_nodes, offsets, targets)
+        print('%8d %8d %11.3fs %11.3fs %9.3fs %10s %9.3fs' %
+              (num_nodes, len(edges), construction_time, condensation_time,
+               reduction_time, reference_time, ccd_time))
+
+    print('\n%8s %8s %8s %10s' % ('graph', 'nodes', 'edges', 'levels'))
+    for name, generator in (('chain', chain), ('fan-out', fan_out)):
+        edges = generator(args.levels_nodes)
+        dependency_graph = graph.Graph(make_nodes(args.levels_nodes, edges))
+        condensed = dependency_graph._Graph__condensation()[1:]
+        levels_time = timed(dependency_graph._Graph__calculate_levels,
+                            *condensed)
+        print('%8s %8d %8d %9.3fs' % (name, args.levels_nodes, len(edges),
+                                      levels_time))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2017 Olzhas Rakhimov
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Comparison of the graph analysis backends on generated graphs.
+
+The graphs are random layered dependencies with back edges for cycles.
+The results of the backends are checked to be identical.
+
+    $ python benchmark/graph_backends.py --nodes 1000 4000 16000
+"""
+
+from __future__ import print_function, absolute_import, division
+
+import argparse as ap
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# pylint: disable=wrong-import-position
+from cppdep import graph
+from graph_analysis import make_nodes, random_dag
+
+
+def analyze(num_nodes, edges, backend):
+    """Returns the analyzed graph and the analysis wall time in seconds."""
+    dependency_graph = graph.Graph(make_nodes(num_nodes, edges))
+    start = time.time()
+    dependency_graph.analyze(backend)
+    return dependency_graph, time.time() - start
+
+
+def results(dependency_graph):
+    """Returns the metrics and edges of the analyzed graph for comparison."""
+    return (sorted((str(x), dependency_graph.node2cd[
+        dependency_graph.node2cycle.get(x, x)], dependency_graph.get_level(x))
+                   for x in dependency_graph.nodes()),
+            sorted(dependency_graph.edges()))
+
+
+def main():
+    """Runs the backends on graphs of increasing sizes."""
+    parser = ap.ArgumentParser(description=__doc__)
+    parser.add_argument('--nodes', type=int, nargs='+',
+                        default=[1000, 4000, 16000, 32000])
+    parser.add_argument('--degree', type=int, default=4)
+    parser.add_argument('--back-edges', type=float, default=0.01,
+                        help='the number of back edges per node')
+    args = parser.parse_args()
+    if 'scipy' not in graph.BACKENDS:
+        sys.exit('The SciPy backend requires NumPy and SciPy.')
+    print('%8s %8s %8s %10s %10s' % ('nodes', 'edges', 'cycles', 'python',
+                                     'scipy'))
+    rng = random.Random(42)
+    for num_nodes in args.nodes:
+        edges = random_dag(num_nodes, args.degree)
+        edges.extend(
+            tuple(sorted(rng.sample(range(num_nodes), 2), reverse=True))
+            for _ in range(int(num_nodes * args.back_edges)))
+        expected, python_time = analyze(num_nodes, edges, 'python')
+        result, scipy_time = analyze(num_nodes, edges, 'scipy')
+        assert results(result) == results(expected), 'Backend mismatch!'
+        print('%8d %8d %8d %9.3fs %9.3fs' % (num_nodes, len(edges),
+                                             len(expected.cycles), python_time,
+                                             scipy_time))
+
+
+if __name__ == '__main__':
+    main()
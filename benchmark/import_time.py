@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2017 Olzhas Rakhimov
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Import time of the command-line entry point in fresh interpreters.
+
+The benchmark fails
+if the best time exceeds the budget
+or the slow dependencies are imported eagerly.
+
+    $ python benchmark/import_time.py --budget 0.15
+"""
+
+from __future__ import print_function, absolute_import, division
+
+import argparse as ap
+import os
+import subprocess
+import sys
+
+# The dependencies to be imported only on first use.
+LAZY_MODULES = ('yaml', 'pykwalify', 'networkx', 'numpy', 'scipy',
+                'multiprocessing')
+
+_SCRIPT = '''
+import sys, time
+start = time.time()
+import %s
+print(time.time() - start)
+print(' '.join(x for x in %r if x in sys.modules))
+'''
+
+
+def import_time(module):
+    """Returns the import time of the module and the eager lazy modules."""
+    output = subprocess.check_output(
+        [sys.executable, '-c', _SCRIPT % (module, LAZY_MODULES)],
+        cwd=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    seconds, eager_modules = output.decode().split('\n')[:2]
+    return float(seconds), eager_modules.split()
+
+
+def main():
+    """Reports the best import time and checks it against the budget."""
+    parser = ap.ArgumentParser(description=__doc__)
+    parser.add_argument('--module', default='cppdep.__main__')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--budget', type=float, default=0.15,
+                        help='the maximum import time in seconds')
+    args = parser.parse_args()
+    import_time(args.module)  # Warm up the bytecode and file system caches.
+    results = [import_time(args.module) for _ in range(args.repeat)]
+    seconds = min(x for x, _ in results)
+    eager_modules = sorted(set(y for _, x in results for y in x))
+    print('%s: %.1f ms (budget %.1f ms)' % (args.module, seconds * 1e3,
+                                            args.budget * 1e3))
+    if eager_modules:
+        print('eagerly imported: %s' % ', '.join(eager_modules))
+    if seconds > args.budget or eager_modules:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
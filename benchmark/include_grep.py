@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2017 Olzhas Rakhimov
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Micro-benchmark of the include directive scanners on large sources.
+
+    $ python benchmark/include_grep.py --lines 20000 --files 10
+"""
+
+from __future__ import print_function, absolute_import, division
+
+import argparse as ap
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cppdep import cppdep  # pylint: disable=wrong-import-position
+
+
+def generate_source(file_path, num_lines, num_includes):
+    """Writes a generated C++ implementation file."""
+    with open(file_path, 'w') as src_file:
+        src_file.write('// Generated source file.\n')
+        for i in range(num_includes):
+            src_file.write('#include "package/header_%d.h"\n' % i)
+        src_file.write('#include <vector>\n\nnamespace generated {\n')
+        for i in range(num_lines):
+            src_file.write('int function_%d(int x) { return x * %d; }  '
+                           '// # not a directive\n' % (i, i))
+        src_file.write('}  // namespace generated\n')
+
+
+def main():
+    """Times the scanners and checks that they find the same directives."""
+    parser = ap.ArgumentParser(description=__doc__)
+    parser.add_argument('--lines', type=int, default=20000)
+    parser.add_argument('--includes', type=int, default=30)
+    parser.add_argument('--files', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        file_paths = [os.path.join(tmp_dir, 'src_%d.cc' % i)
+                      for i in range(args.files)]
+        for file_path in file_paths:
+            generate_source(file_path, args.lines, args.includes)
+        results = {}
+        for name, grep in sorted(cppdep.SCANNERS.items()):
+            results[name] = [[str(x) for x in grep(y)] for y in file_paths]
+            seconds = min(
+                timeit.repeat(lambda: [list(grep(x)) for x in file_paths],
+                              number=1, repeat=args.repeat))
+            print('%-6s %8.2f ms' % (name, seconds * 1e3))
+            results[name + '_time'] = seconds
+        assert results['text'] == results['bytes'], 'Scanners disagree!'
+        print('speedup: %.1fx' % (results['text_time'] / results['bytes_time']))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2017 Olzhas Rakhimov
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Benchmark of the analysis phases on a synthetic or given project.
+
+The phases are timed with the profile of the serial analysis.
+The steps of the graph analysis are timed in place
+by wrapping the Graph methods.
+The times of the graphs are summed up per phase.
+The minimum times over the repetitions are written in JSON
+to compare the results across commits.
+
+    $ python benchmark/phases.py --packages 100 --output phases.json
+    $ python benchmark/phases.py --config /path/to/.cppdep.yml
+"""
+
+from __future__ import print_function, absolute_import, division
+
+import argparse as ap
+import collections
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# pylint: disable=wrong-import-position
+from cppdep import cppdep
+from cppdep.graph import Graph
+from cppdep.profiling import Profile
+import generate_project
+
+# (phase, owner, attribute) of the timed functions.
+PHASES = (
+    ('graph condensation', Graph, '_Graph__condensation'),
+    ('graph transitive reduction', Graph, '_Graph__transitive_reduction'),
+    ('graph ccd', Graph, '_Graph__calculate_ccd'),
+    ('graph levels', Graph, '_Graph__calculate_levels'),
+)
+
+
+class PhaseTimer(object):
+    """Accumulates the wall time of the wrapped functions per phase."""
+
+    def __init__(self):
+        """Initializes the timer without wrapped functions."""
+        self.seconds = collections.defaultdict(float)
+        self.__originals = []  # [(owner, attribute, original)]
+
+    def wrap(self, phase, owner, attribute):
+        """Replaces the function of the class with its timed version."""
+        original = owner.__dict__[attribute]
+        function = getattr(owner, attribute)
+
+        def _timed(*args, **kwargs):
+            start = time.time()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.seconds[phase] += time.time() - start
+
+        if isinstance(original, staticmethod):
+            _timed = staticmethod(_timed)
+        self.__originals.append((owner, attribute, original))
+        setattr(owner, attribute, _timed)
+
+    def restore(self):
+        """Restores the original functions."""
+        while self.__originals:
+            setattr(*self.__originals.pop())
+
+
+def git_commit():
+    """Returns the commit of the working tree or None."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.STDOUT).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(config_path, output_dir):
+    """Runs the analysis of the project once.
+
+    Args:
+        config_path: The absolute path to the configuration file
+            in the root directory of the project.
+        output_dir: The directory for the DOT files.
+
+    Returns:
+        The analysis, {phase: seconds}, and {event: count}.
+    """
+    profile = Profile()
+    timer = PhaseTimer()
+    for phase in PHASES:
+        timer.wrap(*phase)
+    args = ap.Namespace(l=False, L=False, backend='python', no_dot=False,
+                        dot_graph=None, dot_cycles=False, dot_levels=False)
+    cwd = os.getcwd()
+    try:
+        os.chdir(os.path.dirname(config_path))  # The project root.
+        start = time.time()
+        analysis = cppdep.DependencyAnalysis(config_path, profile=profile)
+        timer.seconds['construction'] = time.time() - start
+        os.chdir(output_dir)
+        start = time.time()
+        analysis.analyze(lambda *_: None, args)
+        timer.seconds['analysis'] = time.time() - start
+    finally:
+        os.chdir(cwd)
+        timer.restore()
+    timer.seconds['total'] = (timer.seconds['construction'] +
+                              timer.seconds['analysis'])
+    for name, times in profile.phases.items():
+        if name.startswith('graph '):  # 'graph <name>: <phase>'
+            name = 'graph ' + name.rsplit(': ', 1)[1]
+        timer.seconds[name] += times[0]
+    return analysis, timer.seconds, profile.counters
+
+
+def main():
+    """Generates the project if needed and writes the phase times."""
+    parser = ap.ArgumentParser(description=__doc__)
+    parser.add_argument('--config', metavar='path',
+                        help='the configuration of an existing project '
+                        'instead of a generated one')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', metavar='path',
+                        help='the JSON output file instead of stdout')
+    generate_project.add_arguments(parser)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)  # Diagnostics of generated projects.
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        result = {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'repeat': args.repeat,
+        }
+        config_path = args.config
+        if config_path:
+            config_path = os.path.abspath(config_path)
+            result['project'] = {'config': config_path}
+        else:
+            result['project'] = generate_project.parameters(args)
+            config_path = generate_project.generate(
+                os.path.join(tmp_dir, 'project'), **result['project'])
+        output_dir = os.path.join(tmp_dir, 'dot')
+        os.mkdir(output_dir)
+        phases = {}
+        for _ in range(args.repeat):
+            analysis, seconds, counters = run(config_path, output_dir)
+            for phase, value in seconds.items():
+                phases[phase] = min(value, phases.get(phase, value))
+        result['phases'] = phases
+        result['counters'] = dict(counters)
+        components = list(analysis.internal_components)
+        result['components'] = len(components)
+        result['files'] = sum(
+            bool(x.hpath) + bool(x.cpath) for x in components)
+        result['packages'] = len(list(analysis.internal_packages))
+    finally:
+        shutil.rmtree(tmp_dir)
+    text = json.dumps(result, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as json_file:
+            json_file.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
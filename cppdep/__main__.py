@@ -22,11 +22,13 @@ from __future__ import print_function, absolute_import
 import argparse as ap
 import logging
 import sys
-
-from yaml import YAMLError
-from pykwalify.core import SchemaError
+import time
 
 from cppdep import cppdep
+from cppdep import graph
+from cppdep.cache import IncludeCache, ValidationCache
+from cppdep.profiling import Profile, phase
+from cppdep.schema import SchemaError
 
 
 def main(argv=None):
@@ -55,19 +57,142 @@ def main(argv=None):
         default=False,
         help='list unreduced dependencies of nodes')
     parser.add_argument('-o', '--output', metavar='path', help='output file')
+    parser.add_argument(
+        '--compile-commands',
+        metavar='path',
+        help='a compilation database (compile_commands.json) '
+        'with implementation files and include directories of the packages')
+    parser.add_argument(
+        '-v',
+        '--verbose',
+        action='store_true',
+        default=False,
+        help='log informational messages and statistics')
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        type=int,
+        default=1,
+        metavar='N',
+        help='the number of processes to scan sources and analyze graphs')
+    parser.add_argument(
+        '--scanner',
+        choices=sorted(cppdep.SCANNERS),
+        default='text',
+        help='the include directive scanner of source files')
+    parser.add_argument(
+        '--preamble',
+        action='store_true',
+        default=False,
+        help='scan source files only up to the first line of code')
+    parser.add_argument(
+        '--max-preamble-lines',
+        type=non_negative_int,
+        metavar='N',
+        help='the maximum number of preamble lines to scan')
+    parser.add_argument(
+        '--backend',
+        choices=graph.BACKENDS,
+        default='python',
+        help='the implementation of graph algorithms '
+        '(scipy requires NumPy and SciPy)')
+    parser.add_argument(
+        '--no-dot',
+        action='store_true',
+        default=False,
+        help='do not write graphs in Graphviz DOT format')
+    parser.add_argument(
+        '--dot-graph',
+        action='append',
+        metavar='name',
+        help='write only the named graph in DOT format '
+        '(system, group, or group_package; repeatable)')
+    parser.add_argument(
+        '--dot-cycles',
+        action='store_true',
+        default=False,
+        help='cluster the nodes of cycles in DOT graphs')
+    parser.add_argument(
+        '--dot-levels',
+        action='store_true',
+        default=False,
+        help='rank the nodes of the same level together in DOT graphs')
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        default=False,
+        help='keep analyzing the graphs affected by changes in source files')
+    parser.add_argument(
+        '--watch-interval',
+        type=float,
+        default=1,
+        metavar='seconds',
+        help='the polling interval of source files in the watch mode')
+    parser.add_argument(
+        '--profile',
+        metavar='path',
+        help='write times of the analysis phases and counters in JSON '
+        '(the include search is counted in file index queries '
+        'and directory listings instead of stat calls)')
+    parser.add_argument(
+        '--cache-dir',
+        metavar='path',
+        help='a directory to keep scanned include directives '
+        'and validated configurations between runs')
+    parser.add_argument(
+        '--cache-size',
+        type=int,
+        default=1000000,
+        metavar='N',
+        help='the maximum number of source files in the cache')
+    parser.add_argument(
+        '--cache-hash',
+        action='store_true',
+        default=False,
+        help='check the content hash of files with modified timestamps')
+    parser.add_argument(
+        '--clear-cache',
+        action='store_true',
+        default=False,
+        help='discard the cached data before the analysis')
     args = parser.parse_args(argv)
     if args.version:
         print(cppdep.VERSION)
         return
+    # The configuration errors of the slow to import dependency.
+    from yaml import YAMLError  # pylint: disable=import-outside-toplevel
+
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO)
 
     def _die(head, body):
         logging.error(str('%s:\n%s' % (head, str(body))))
         sys.exit(1)
 
+    profile = Profile() if args.profile else None
     try:
-        analysis = cppdep.DependencyAnalysis(args.config)
+        with phase(profile, 'include cache loading'):
+            include_cache = get_include_cache(args)
+        validation_cache = get_validation_cache(args)
+        analysis = cppdep.DependencyAnalysis(
+            args.config, include_cache, args.jobs, args.scanner, args.preamble,
+            args.max_preamble_lines, profile, validation_cache,
+            args.compile_commands)
+        if validation_cache is not None and validation_cache.misses:
+            validation_cache.save()
+        if include_cache is not None:
+            logging.info('include cache: %d hits, %d misses',
+                         include_cache.hits, include_cache.misses)
+            with phase(profile, 'include cache saving'):
+                include_cache.save()
+        logging.info('include resolution: %d hits, %d misses',
+                     analysis.locate_hits, analysis.locate_misses)
         printer = get_printer(args.output)
         analysis.analyze(printer, args)
+        if args.watch:
+            watch(analysis, printer, args)
+        if profile is not None:
+            profile.write(args.profile)
     except IOError as err:
         _die('IO Error', err)
     except YAMLError as err:
@@ -80,6 +205,78 @@ def main(argv=None):
         _die('Analysis (Configuration) Error', err)
 
 
+def watch(analysis, printer, args):
+    """Polls source files and analyzes the graphs affected by changes.
+
+    The polling stops upon keyboard interrupt.
+
+    Args:
+        analysis: The complete dependency analysis.
+        printer: The printer of the reports.
+        args: The command-line arguments.
+
+    Raises:
+        AnalysisError: Failure to associate a header to a component.
+    """
+    identities = analysis.source_identities()
+    try:
+        while True:
+            time.sleep(args.watch_interval)
+            new_identities = analysis.source_identities()
+            changed_paths = [
+                x for x in set(identities).union(new_identities)
+                if identities.get(x) != new_identities.get(x)
+            ]
+            if not changed_paths:
+                continue
+            start_time = time.time()
+            graphs = analysis.update(changed_paths)
+            logging.info('watch: %d changed paths updated in %.3fs',
+                         len(changed_paths), time.time() - start_time)
+            identities = analysis.source_identities()
+            if graphs:
+                analysis.analyze(printer, args, graphs)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if analysis.include_cache is not None:
+            analysis.include_cache.save()
+
+
+def non_negative_int(text):
+    """Converts the argument into a non-negative integer for argparse."""
+    value = int(text)
+    if value < 0:
+        raise ap.ArgumentTypeError('%s is negative' % text)
+    return value
+
+
+def get_include_cache(args):
+    """Returns the include cache requested by the arguments or None."""
+    if not args.cache_dir:
+        return None
+    tag = None
+    if args.preamble:
+        tag = 'preamble'
+        if args.max_preamble_lines is not None:
+            tag += str(args.max_preamble_lines)
+    include_cache = IncludeCache(args.cache_dir, args.cache_size,
+                                 args.cache_hash, tag)
+    if args.clear_cache:
+        include_cache.invalidate()
+    return include_cache
+
+
+def get_validation_cache(args):
+    """Returns the configuration validation cache or None."""
+    if not args.cache_dir:
+        return None
+    validation_cache = ValidationCache(args.cache_dir)
+    if args.clear_cache:
+        validation_cache.invalidate()
+    return validation_cache
+
+
 def get_printer(file_path=None):
     """Returns printer for the report."""
     destination = open(file_path, 'w') if file_path else sys.stdout
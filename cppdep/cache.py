@@ -0,0 +1,305 @@
+# Copyright (C) 2017 Olzhas Rakhimov
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Persistent caches of include directives and validated configurations.
+
+The include cache maps source file paths to their include directives
+along with the information about the scans (e.g., diagnostics).
+An entry is valid as long as the file identity,
+i.e., (size, modification time, inode), is unchanged.
+Optionally, the content hash of the file is recorded
+to rescue entries of files touched without modification
+(e.g., after a checkout or a copy).
+
+The validation cache records the content digests of configuration files
+that passed the schema validation.
+"""
+
+from __future__ import absolute_import
+
+import collections
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+_PICKLE_PROTOCOL = 2  # Shared between Python 2 and 3.
+
+_replace = getattr(os, 'replace', os.rename)  # pylint: disable=invalid-name
+
+
+def file_identity(stat_result):
+    """Returns (size, mtime_ns, inode) identity of a file from its stat."""
+    mtime_ns = getattr(stat_result, 'st_mtime_ns', None)
+    if mtime_ns is None:
+        mtime_ns = int(stat_result.st_mtime * 1e9)
+    return stat_result.st_size, mtime_ns, stat_result.st_ino
+
+
+def file_digest(file_path):
+    """Returns the hex digest of the file content."""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as src_file:
+        for block in iter(lambda: src_file.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IncludeCache(object):
+    """On-disk cache of include directives per source file.
+
+    The entries are kept in the least-recently-used order
+    for eviction upon saving the cache.
+
+    Attributes:
+        path: The path to the cache file.
+        max_entries: The maximum number of entries kept upon saving.
+        use_hash: Fall back to the content hash upon file identity mismatch.
+        hits: The number of lookups served from the cache.
+        misses: The number of lookups requiring a file scan.
+    """
+
+    VERSION = 2  # Bump upon incompatible changes in the entry format.
+    FILENAME = 'includes.cache'
+
+    def __init__(self, cache_dir, max_entries=1000000, use_hash=False,
+                 tag=None):
+        """Loads the cache from the directory if it exists.
+
+        Broken or incompatible cache files are silently discarded.
+
+        Args:
+            cache_dir: The directory to store the cache file.
+            max_entries: The upper bound on the number of cached files.
+            use_hash: Record and check the content hash of the files.
+            tag: The name of the scanning mode with different results
+                to keep the entries in a separate file.
+        """
+        filename = IncludeCache.FILENAME
+        if tag:
+            filename = '%s.%s' % (tag, filename)
+        self.path = os.path.join(cache_dir, filename)
+        self.max_entries = max_entries
+        self.use_hash = use_hash
+        self.hits = 0
+        self.misses = 0
+        # {file_path: (identity, digest, pickled (includes, info))}
+        self.__entries = collections.OrderedDict()
+        self.__identities = {}  # {file_path: identity} upon missed lookups.
+        self.__load()
+
+    def __len__(self):
+        """Returns the number of cached files."""
+        return len(self.__entries)
+
+    def __load(self):
+        """Loads the entries from the cache file."""
+        if not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as cache_file:
+                version, entries = pickle.load(cache_file)
+        except (IOError, OSError, EOFError, ValueError, TypeError,
+                pickle.UnpicklingError) as err:
+            logging.info('include cache: discarding %s: %s', self.path, err)
+            return
+        if version != IncludeCache.VERSION:
+            logging.info('include cache: discarding %s: version mismatch',
+                         self.path)
+            return
+        self.__entries.update(entries)
+
+    def get(self, file_path):
+        """Retrieves the include directives of a source file.
+
+        Args:
+            file_path: The full path to the source file.
+
+        Returns:
+            A fresh list of include directives,
+            or None if the file must be scanned.
+
+        Raises:
+            OSError: The file is not accessible.
+        """
+        entry = self.lookup(file_path)
+        return None if entry is None else entry[0]
+
+    def lookup(self, file_path):
+        """Retrieves the include directives with the scan info of a file.
+
+        Args:
+            file_path: The full path to the source file.
+
+        Returns:
+            A fresh (list of include directives, info given to 'put'),
+            or None if the file must be scanned.
+
+        Raises:
+            OSError: The file is not accessible.
+        """
+        identity = file_identity(os.stat(file_path))
+        entry = self.__entries.pop(file_path, None)
+        if entry is not None:
+            if (entry[0] != identity and self.use_hash and entry[1] and
+                    entry[1] == file_digest(file_path)):
+                entry = (identity,) + entry[1:]
+            if entry[0] == identity:
+                self.__entries[file_path] = entry  # Most recently used.
+                self.hits += 1
+                return pickle.loads(entry[2])
+        self.misses += 1
+        self.__identities[file_path] = identity
+        return None
+
+    def put(self, file_path, includes, info=None):
+        """Stores the include directives of a missed source file.
+
+        Args:
+            file_path: The full path to the source file given to 'get'.
+            includes: The include directives scanned from the file.
+            info: The optional picklable information about the scan
+                (e.g., the diagnostics to report upon cache hits).
+        """
+        identity = self.__identities.pop(file_path, None)
+        if identity is None:
+            identity = file_identity(os.stat(file_path))
+        digest = file_digest(file_path) if self.use_hash else None
+        self.__entries.pop(file_path, None)
+        self.__entries[file_path] = (identity, digest,
+                                     pickle.dumps((list(includes), info),
+                                                  _PICKLE_PROTOCOL))
+
+    def invalidate(self, file_paths=None):
+        """Removes cache entries.
+
+        Args:
+            file_paths: The source file paths to forget.
+                If None, the whole cache is cleared.
+        """
+        if file_paths is None:
+            self.__entries.clear()
+        else:
+            for file_path in file_paths:
+                self.__entries.pop(file_path, None)
+
+    def save(self):
+        """Writes the cache into its file evicting least recently used entries.
+
+        Raises:
+            IOError: Failure to write into the cache directory.
+        """
+        while len(self.__entries) > self.max_entries:
+            self.__entries.popitem(last=False)
+        _dump(self.path, (IncludeCache.VERSION, list(self.__entries.items())))
+
+
+class ValidationCache(object):
+    """On-disk record of configuration digests that passed validation.
+
+    Attributes:
+        path: The path to the cache file.
+        max_entries: The maximum number of digests kept upon saving.
+        hits: The number of digests found in the cache.
+        misses: The number of digests requiring validation.
+    """
+
+    VERSION = 1  # Bump upon incompatible changes in the entry format.
+    FILENAME = 'config.cache'
+
+    def __init__(self, cache_dir, max_entries=100):
+        """Loads the cache from the directory if it exists.
+
+        Broken or incompatible cache files are silently discarded.
+
+        Args:
+            cache_dir: The directory to store the cache file.
+            max_entries: The upper bound on the number of cached digests.
+        """
+        self.path = os.path.join(cache_dir, ValidationCache.FILENAME)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.__digests = collections.OrderedDict()  # {digest: None}
+        self.__load()
+
+    def __len__(self):
+        """Returns the number of cached digests."""
+        return len(self.__digests)
+
+    def __contains__(self, digest):
+        """Checks whether the digest has passed the validation."""
+        if digest in self.__digests:
+            self.__digests[digest] = self.__digests.pop(digest)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def __load(self):
+        """Loads the digests from the cache file."""
+        if not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as cache_file:
+                version, digests = pickle.load(cache_file)
+        except (IOError, OSError, EOFError, ValueError, TypeError,
+                pickle.UnpicklingError) as err:
+            logging.info('validation cache: discarding %s: %s', self.path,
+                         err)
+            return
+        if version != ValidationCache.VERSION:
+            logging.info('validation cache: discarding %s: version mismatch',
+                         self.path)
+            return
+        self.__digests.update((x, None) for x in digests)
+
+    def add(self, digest):
+        """Records the digest of a valid configuration."""
+        self.__digests.pop(digest, None)
+        self.__digests[digest] = None
+
+    def invalidate(self):
+        """Forgets all the digests."""
+        self.__digests.clear()
+
+    def save(self):
+        """Writes the cache into its file evicting least recently used digests.
+
+        Raises:
+            IOError: Failure to write into the cache directory.
+        """
+        while len(self.__digests) > self.max_entries:
+            self.__digests.popitem(last=False)
+        _dump(self.path, (ValidationCache.VERSION, list(self.__digests)))
+
+
+def _dump(file_path, value):
+    """Atomically replaces the file with the pickled value.
+
+    Raises:
+        IOError: Failure to write into the directory of the file.
+    """
+    cache_dir = os.path.dirname(file_path)
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    file_descriptor, tmp_path = tempfile.mkstemp(dir=cache_dir)
+    try:
+        with os.fdopen(file_descriptor, 'wb') as cache_file:
+            pickle.dump(value, cache_file, _PICKLE_PROTOCOL)
+        _replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,161 @@
+# Copyright (C) 2017 Olzhas Rakhimov
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Streaming reader of JSON compilation databases.
+
+The compilation database (compile_commands.json)
+is an array of command objects with
+'directory', 'file', and 'command' or 'arguments' of the compiler call.
+The array is decoded one command object at a time
+to keep the memory bounded for large databases.
+"""
+
+from __future__ import absolute_import
+
+import io
+import json
+import os.path
+import re
+import shlex
+
+_WHITESPACE = re.compile(r'\s*')
+
+# The compiler flags of include search directories.
+_INCLUDE_FLAGS = ('-I', '-isystem', '-iquote', '-idirafter')
+
+# The include directories in commands without shell quoting
+# (the flags follow the compiler).
+_RE_INCLUDE_DIR = re.compile(r'\s-(?:I|i(?:system|quote|dirafter))\s*(\S+)')
+
+
+def read_commands(file_path, chunk_size=1 << 20):
+    """Yields the command objects from the compilation database.
+
+    Args:
+        file_path: The path to the compile_commands.json file.
+        chunk_size: The number of characters to read at a time.
+
+    Yields:
+        The command dictionaries in the order of the database.
+
+    Raises:
+        IOError: The file is not readable.
+        ValueError: The file is not a JSON array of command objects.
+    """
+    decoder = json.JSONDecoder()
+    with io.open(file_path, encoding='utf-8') as json_file:
+        text = ''
+        pos = 0
+        state = '['  # The expected token: '[', 'first', ',', or 'command'.
+        while True:
+            pos = _WHITESPACE.match(text, pos).end()
+            if pos == len(text):
+                text = json_file.read(chunk_size)
+                pos = 0
+                if not text:
+                    raise ValueError('%s: unexpected end of file' % file_path)
+                continue
+            char = text[pos]
+            if state == '[':
+                if char != '[':
+                    raise ValueError('%s: not a JSON array' % file_path)
+                pos += 1
+                state = 'first'
+            elif char == ']' and state in ('first', ','):
+                return
+            elif state == ',':
+                if char != ',':
+                    raise ValueError('%s: expected a comma at %r' %
+                                     (file_path, text[pos:pos + 20]))
+                pos += 1
+                state = 'command'
+            else:
+                try:
+                    command, end = decoder.raw_decode(text, pos)
+                except ValueError:  # Incomplete or malformed.
+                    chunk = json_file.read(chunk_size)
+                    if not chunk:
+                        raise
+                    text = text[pos:] + chunk
+                    pos = 0
+                    continue
+                if not isinstance(command, dict):
+                    raise ValueError('%s: %r is not a command object' %
+                                     (file_path, command))
+                yield command
+                pos = end
+                state = ','
+
+
+def source_path(command):
+    """Returns the absolute normalized path of the compiled file.
+
+    Raises:
+        ValueError: The command is missing its file or directory.
+    """
+    try:
+        return os.path.normpath(
+            os.path.join(command['directory'], command['file']))
+    except KeyError as err:
+        raise ValueError('Command %r is missing %s' % (command, err))
+
+
+def _is_quoted(line):
+    """Returns True if the command line needs the shell parsing."""
+    return '"' in line or "'" in line or '\\' in line
+
+
+def arguments(command):
+    """Returns the list of the compiler call arguments.
+
+    The 'command' string is split as in POSIX shells.
+    """
+    if 'arguments' in command:
+        return command['arguments']
+    line = command.get('command', '')
+    if _is_quoted(line):
+        return shlex.split(line)
+    return line.split()  # Much faster for the common unquoted commands.
+
+
+def include_dirs(command, cache=None):
+    """Returns the absolute include search directories of the command.
+
+    Args:
+        command: The command object from the compilation database.
+        cache: An optional dictionary to share the results
+            among the commands with the same directory and include flags.
+
+    Returns:
+        The normalized directory paths in the order of the flags.
+    """
+    line = command.get('command', '')
+    if 'arguments' not in command and not _is_quoted(line):
+        dir_paths = _RE_INCLUDE_DIR.findall(line)
+    else:
+        dir_paths = []
+        args = iter(arguments(command)[1:])
+        for arg in args:
+            if arg.startswith(_INCLUDE_FLAGS):
+                flag = next(x for x in _INCLUDE_FLAGS if arg.startswith(x))
+                dir_path = arg[len(flag):] or next(args, '')
+                if dir_path:
+                    dir_paths.append(dir_path)
+    key = (command.get('directory', ''), tuple(dir_paths))
+    result = None if cache is None else cache.get(key)
+    if result is None:
+        result = [os.path.normpath(os.path.join(key[0], x)) for x in dir_paths]
+        if cache is not None:
+            cache[key] = result
+    return result
@@ -23,27 +23,36 @@ from __future__ import absolute_import
 
 import collections
 import fnmatch
+import functools
 import glob
 import itertools
+import locale
 import logging
+import mmap
 import os.path
 import re
 import sys
 
-from yaml import safe_load
-from pykwalify.core import Core as Validator
+try:
+    from os import scandir
+except ImportError:  # Python 2
+    scandir = None  # pylint: disable=invalid-name
 
+from . import compdb
+from .cache import file_identity
 from .graph import Graph
+from .profiling import Profile, phase
+from . import schema
 
 VERSION = '0.2.4'  # The latest release version.
 
-_SCHEMA_FILE = os.path.join(
-    os.path.dirname(os.path.abspath(__file__)), 'config_schema.yml')
-assert os.path.isfile(_SCHEMA_FILE), 'The cppdep schema file is missing.'
-assert safe_load(open(_SCHEMA_FILE))  # Will throw if invalid.
-
 _FILE_OPEN_FLAGS = {} if sys.version[0] == '2' else {'errors': 'replace'}
 
+_RE_GLOB = re.compile(r'[*?[]')  # The special characters of glob patterns.
+
+_MMAP_MIN_SIZE = 1 << 20  # Files to map into memory instead of reading.
+_ENCODING = locale.getpreferredencoding(False)  # The default for open().
+
 # Allowed common abbreviations in the code:
 # ccd   - Cumulative Component Dependency (CCD)
 # nccd  - Normalized CCD
@@ -72,6 +81,13 @@ def warn(message):
     logging.warn(message)
 
 
+def decode(text):
+    """Decodes bytes as in reading of files in text mode."""
+    if sys.version[0] == '2':
+        return text
+    return text.decode(_ENCODING, 'replace')
+
+
 def strip_ext(filename):
     """Strips the extension from a filename."""
     return os.path.splitext(filename)[0]
@@ -86,7 +102,7 @@ def path_common(paths):
     """Returns common prefix path for the argument absolute normalized paths."""
     if not paths:
         return ''
-    path = os.path.commonprefix(paths)
+    path = os.path.commonprefix(list(paths))
     assert os.path.isabs(path)
     if path[-1] == os.path.sep:
         return os.path.dirname(path)
@@ -104,6 +120,16 @@ def path_isancestor(parent, child):
             child[len(parent)] == os.path.sep)
 
 
+def path_ancestors(path):
+    """Yields the abspath itself and its ancestors up to the root."""
+    yield path
+    parent = os.path.dirname(path)
+    while parent != path:
+        path = parent
+        yield path
+        parent = os.path.dirname(path)
+
+
 def path_to_posix_sep(path):
     """Normalize the path separator to Posix (mostly for Windows)."""
     return path.replace('\\', '/') if os.name == 'nt' else path
@@ -119,6 +145,260 @@ def yaml_optional_list(dictionary, element):
     return yaml_optional(dictionary, element, [])
 
 
+def glob_matcher(patterns):
+    """Compiles glob patterns into a single matcher of paths.
+
+    Args:
+        patterns: The glob patterns as in fnmatch.
+
+    Returns:
+        A function checking if a path matches any of the patterns.
+    """
+    if not patterns:
+        return lambda _: False
+    regex = re.compile('|'.join(
+        fnmatch.translate(os.path.normcase(x)) for x in patterns))
+    return lambda path: regex.match(os.path.normcase(path)) is not None
+
+
+def walk_files(dir_path, is_ignored):
+    """Walks a directory tree top-down as os.walk without symbolic links.
+
+    Ignored directories are pruned without listing their subtrees.
+
+    Args:
+        dir_path: The root directory of the tree.
+        is_ignored: The predicate of ignored directory paths.
+
+    Yields:
+        (directory path, [file name]) in the os.walk order.
+    """
+    if is_ignored(dir_path):
+        return
+    if scandir is None:
+        for root, dir_names, file_names in os.walk(dir_path):
+            dir_names[:] = [
+                x for x in dir_names if not is_ignored(os.path.join(root, x))
+            ]
+            yield root, file_names
+        return
+    dir_stack = [dir_path]
+    while dir_stack:
+        root = dir_stack.pop()
+        sub_dirs = []
+        file_names = []
+        try:
+            entries = list(scandir(root))
+        except OSError:  # Not an accessible directory.
+            continue
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if not is_dir:
+                file_names.append(entry.name)
+            elif not entry.is_symlink() and not is_ignored(entry.path):
+                sub_dirs.append(entry.path)
+        yield root, file_names
+        dir_stack.extend(reversed(sub_dirs))
+
+
+def walk_file_paths(dir_path, is_ignored, dir_paths=None):
+    """Yields the paths to the files in a directory tree as in walk_files.
+
+    Args:
+        dir_path: The root directory of the tree.
+        is_ignored: The predicate of ignored directory paths.
+        dir_paths: An optional set to collect the traversed directories.
+    """
+    for root, file_names in walk_files(dir_path, is_ignored):
+        if dir_paths is not None:
+            dir_paths.add(root)
+        for file_name in file_names:
+            yield os.path.join(root, file_name)
+
+
+# The source file with its reversed path components without the extension.
+# This approach is pessimistic with O(N*logN) instead of O(N)
+# because it assumes the header and implementation files
+# are likely to be in different directories.
+_SourceFile = collections.namedtuple('File', ['rev_path', 'path'])
+
+
+def _reverse_path(path):
+    """Returns the reversed list of the path components w/o the extension."""
+    path = strip_ext(path).split(os.path.sep)
+    path.reverse()
+    return path
+
+
+def _add_source_file(path, is_ignored, hpaths, cpaths, all_cfiles=True):
+    """Adds a header or implementation file to be paired by its name.
+
+    Args:
+        path: The path to the file.
+        is_ignored: The predicate of ignored paths.
+        hpaths: The destination {name: [_SourceFile]} of header files.
+        cpaths: The destination {name: [_SourceFile]} of implementation files.
+        all_cfiles: False to add only included implementation files (.ipp).
+    """
+    filename = os.path.basename(path)
+    src_match = Package._RE_SRC.match(filename)
+    if not src_match or is_ignored(path):
+        return
+    if src_match.group('h'):
+        src_files = hpaths
+    elif all_cfiles or filename.lower().endswith('.ipp'):
+        src_files = cpaths
+    else:
+        return
+    src_files[strip_ext(filename)].append(
+        _SourceFile(_reverse_path(path), path))
+
+
+class FileIndex(object):
+    """Index of regular files in directories to replace per-file stat calls.
+
+    The directories are listed upon the first query
+    and are assumed not to change until invalidated.
+
+    Attributes:
+        lookups: The number of file queries instead of stat calls.
+        listings: The number of directory listings.
+    """
+
+    def __init__(self):
+        """Initializes an empty index."""
+        self.__listings = {}  # {dir_path: frozenset(filename)}
+        self.lookups = 0
+        self.listings = 0
+
+    def isfile(self, path):
+        """The index counterpart of os.path.isfile for normalized paths."""
+        self.lookups += 1
+        dir_path, filename = os.path.split(os.path.normcase(path))
+        listing = self.__listings.get(dir_path)
+        if listing is None:
+            self.listings += 1
+            listing = FileIndex.__list_files(dir_path)
+            self.__listings[dir_path] = listing
+        return filename in listing
+
+    def invalidate(self, dir_path):
+        """Forgets the listing of a changed directory."""
+        self.__listings.pop(os.path.normcase(dir_path), None)
+
+    @staticmethod
+    def __list_files(dir_path):
+        """Returns a set of regular file names in a directory."""
+        try:
+            if scandir is None:
+                return frozenset(
+                    os.path.normcase(x) for x in os.listdir(dir_path)
+                    if os.path.isfile(os.path.join(dir_path, x)))
+            return frozenset(
+                os.path.normcase(x.name) for x in scandir(dir_path)
+                if x.is_file())
+        except OSError:  # Not an accessible directory.
+            return frozenset()
+
+
+class IncludePatterns(object):
+    """Include directive patterns of external packages as a single matcher.
+
+    Consecutive patterns are combined into regex alternations
+    with a capturing group per pattern to map the match to its package.
+    The alternations are split into chunks
+    to stay within the limit of groups in older Python versions.
+    Patterns with own groups (e.g., backreferences) or flags
+    are matched separately in their original place.
+    The first matching pattern wins
+    as with the sequential matching of the patterns.
+    """
+
+    _DEFAULT_FLAGS = re.compile('').flags
+    _MAX_GROUPS = 99  # Python 2 and <3.5 limit regexes to 100 groups.
+
+    def __init__(self, include_patterns):
+        """Compiles the patterns into the matcher.
+
+        Args:
+            include_patterns: (package, [regex]) in the order of priority.
+        """
+        self.__matchers = []  # [(regex, [package])]
+        alternatives = []
+        packages = []
+
+        def _flush():
+            if alternatives:
+                self.__matchers.append((re.compile('|'.join(alternatives)),
+                                        list(packages)))
+                del alternatives[:]
+                del packages[:]
+
+        for package, patterns in include_patterns:
+            for pattern in patterns:
+                if (pattern.groups or
+                        pattern.flags != IncludePatterns._DEFAULT_FLAGS):
+                    _flush()
+                    self.__matchers.append((pattern, [package]))
+                else:
+                    alternatives.append('(%s)' % pattern.pattern)
+                    packages.append(package)
+                    if len(alternatives) == IncludePatterns._MAX_GROUPS:
+                        _flush()
+        _flush()
+
+    def match(self, hfile):
+        """Returns the package of the first matching pattern or None."""
+        for regex, packages in self.__matchers:
+            match = regex.match(hfile)
+            if match:
+                return packages[match.lastindex - 1 if len(packages) > 1 else 0]
+        return None
+
+
+class ScanInfo(object):
+    """Information collected by a scanner about a source file.
+
+    The diagnostics are kept to be reported
+    along with the include directives from the cache.
+
+    Attributes:
+        bytes_read: The number of bytes read from the file.
+        preamble_end: The line number of the code ending the preamble.
+        truncated_at: The maximum number of lines truncating the preamble.
+    """
+
+    __slots__ = ['bytes_read', 'preamble_end', 'truncated_at']
+
+    def __init__(self, bytes_read=0, preamble_end=None, truncated_at=None):
+        """Initializes with the scan results."""
+        self.bytes_read = bytes_read
+        self.preamble_end = preamble_end
+        self.truncated_at = truncated_at
+
+    def __reduce__(self):
+        """Pickles for the process pool jobs and the include cache."""
+        return ScanInfo, (self.bytes_read, self.preamble_end,
+                          self.truncated_at)
+
+    def report(self, file_path):
+        """Logs the diagnostics of the scan of the source file."""
+        if self.preamble_end is not None:
+            logging.info('include scan: preamble ends at line %d: %s',
+                         self.preamble_end, file_path)
+        if self.truncated_at is not None:
+            warn('include issues: preamble truncated at %d lines: %s' %
+                 (self.truncated_at, file_path))
+
+
+def _file_offset(src_file):
+    """Returns the number of bytes read so far from the open file."""
+    return os.lseek(src_file.fileno(), 0, os.SEEK_CUR)
+
+
 class Include(object):
     """Representation of an include directive.
 
@@ -132,6 +412,16 @@ class Include(object):
     _RE_INCLUDE = re.compile(r'^\s*#\s*include\s*'
                              r'(<(?P<brackets>\S+?)>|"(?P<quotes>\S+?)")')
 
+    # The bytes counterpart of _RE_INCLUDE w/o the line start anchoring
+    # to take advantage of the literal prefix for the fast search.
+    # The ASCII whitespace separators (\x1c-\x1f) are the same
+    # as for the unicode regex.
+    _BLANK_BYTES = b' \t\f\v\x1c\x1d\x1e\x1f'
+    _RE_INCLUDE_BYTES = re.compile(br'#[ \t\f\v\x1c-\x1f]*include'
+                                   br'[ \t\f\v\x1c-\x1f]*'
+                                   br'(?:<([^\s\x1c-\x1f]+?)>|'
+                                   br'"([^\s\x1c-\x1f]+?)")')
+
     __slots__ = ['__include_path', 'hfile', 'with_quotes', 'hpath']
 
     def __init__(self, include_path, with_quotes):
@@ -164,18 +454,31 @@ class Include(object):
         """Assumes the same working directory and search paths."""
         return not self == other
 
+    def __reduce__(self):
+        """Pickles the directive without its location."""
+        return Include, (self.__include_path, self.with_quotes)
+
     @staticmethod
-    def grep(file_path):
+    def grep(file_path, preamble=False, max_lines=None, scan=None):
         """Processes include directives in a source file.
 
         Args:
             file_path: The full path to the source file.
+            preamble: Stop at the first line of code after the preamble.
+            max_lines: The maximum number of lines in the preamble to process.
+            scan: The optional ScanInfo to fill upon the completion
+                instead of reporting the diagnostics.
 
         Yields:
             Include objects constructed with the directives.
         """
+        report = scan is None
+        if report:
+            scan = ScanInfo()
         with open(file_path, **_FILE_OPEN_FLAGS) as src_file:
-            for line in src_file:
+            lines = src_file if not preamble else Include.__preamble(
+                src_file, scan, max_lines, ('#', '//', '/*', '*/', '\\'))
+            for line in lines:
                 include = Include._RE_INCLUDE.search(line)
                 if not include:
                     continue
@@ -183,8 +486,119 @@ class Include(object):
                     yield Include(include.group("brackets"), with_quotes=False)
                 else:
                     yield Include(include.group("quotes"), with_quotes=True)
+            scan.bytes_read = _file_offset(src_file)
+        if report:
+            scan.report(file_path)
+
+    @staticmethod
+    def grep_bytes(file_path, preamble=False, max_lines=None, scan=None):
+        """Processes include directives in the raw bytes of a source file.
+
+        This is a faster alternative to the line-by-line text processing.
+        Only the paths of the directives are decoded.
+        Large files are mapped into memory instead of reading.
 
-    def locate(self, cwd, include_dirs, include_patterns):
+        Args:
+            file_path: The full path to the source file.
+            preamble: Stop at the first line of code after the preamble.
+            max_lines: The maximum number of lines in the preamble to process.
+            scan: The optional ScanInfo to fill upon reading
+                instead of reporting the diagnostics.
+
+        Yields:
+            Include objects constructed with the directives
+            as in Include.grep for ASCII-compatible encodings.
+        """
+        report = scan is None
+        if report:
+            scan = ScanInfo()
+        with open(file_path, 'rb') as src_file:
+            size = os.fstat(src_file.fileno()).st_size
+            if preamble:
+                text = b''.join(
+                    Include.__preamble(src_file, scan, max_lines,
+                                       (b'#', b'//', b'/*', b'*/', b'\\')))
+                size = _file_offset(src_file)
+            elif size < _MMAP_MIN_SIZE:
+                text = src_file.read()
+            else:
+                text = mmap.mmap(
+                    src_file.fileno(), 0, access=mmap.ACCESS_READ)
+            scan.bytes_read = size
+            if report:
+                scan.report(file_path)
+            try:
+                if text.find(b'include') < 0:
+                    return
+                for include in Include._RE_INCLUDE_BYTES.finditer(text):
+                    pos = include.start()
+                    line_start = text.rfind(b'\n', 0, pos) + 1
+                    line_start = max(line_start,
+                                     text.rfind(b'\r', line_start, pos) + 1)
+                    if text[line_start:pos].strip(Include._BLANK_BYTES):
+                        continue  # Not a preprocessor directive.
+                    if include.group(1):
+                        yield Include(decode(include.group(1)),
+                                      with_quotes=False)
+                    else:
+                        yield Include(decode(include.group(2)),
+                                      with_quotes=True)
+            finally:
+                if isinstance(text, mmap.mmap):
+                    text.close()
+
+    @staticmethod
+    def __preamble(lines, scan, max_lines, tokens):
+        """Yields the lines of the source file preamble.
+
+        The preamble consists of blank, comment,
+        and preprocessor directive lines (with continuation lines).
+        Comment delimiters inside of string literals are not recognized.
+
+        Args:
+            lines: The source file lines (text or bytes).
+            scan: The ScanInfo to record the diagnostics.
+            max_lines: The maximum number of lines to yield.
+            tokens: The (directive, line comment, comment start, comment end,
+                line continuation) tokens of the same type as the lines.
+        """
+        directive, line_comment, comment_start, comment_end, escape = tokens
+        in_comment = False
+        continued = False
+        for num_line, line in enumerate(lines):
+            code = line.strip()
+            if continued:
+                continued = code.endswith(escape)
+                code = code[:0]
+            while code:
+                if in_comment:
+                    end = code.find(comment_end)
+                    in_comment = end < 0
+                    code = (code[:0] if in_comment else
+                            code[end + len(comment_end):].lstrip())
+                elif code.startswith(comment_start):
+                    in_comment = True
+                    code = code[len(comment_start):]
+                elif code.startswith(line_comment):
+                    code = code[:0]
+                else:
+                    break
+            if code and not code.startswith(directive):
+                scan.preamble_end = num_line + 1
+                return
+            # The line after the maximum is classified
+            # to warn only if the preamble continues.
+            if max_lines is not None and num_line >= max_lines:
+                scan.truncated_at = max_lines
+                return
+            if code:
+                continued = code.endswith(escape)
+                in_comment = code.rfind(comment_start) > code.rfind(
+                    comment_end)
+            yield line
+
+    def locate(self, cwd, include_dirs, include_patterns,
+               isfile=os.path.isfile):
         """Locates the included header file path.
 
         All input directory paths must be absolute.
@@ -193,7 +607,9 @@ class Include(object):
             cwd: The working directory for source file processing.
             include_dirs: The directories to search for the file,
                 ordered from internal to external/system directories.
-            include_patterns: (package, [regex]) to search with patterns.
+            include_patterns: IncludePatterns or (package, [regex])
+                to search with patterns.
+            isfile: The file existence check (e.g., FileIndex.isfile).
 
         Returns:
             (hpath, package) with None indicating failure to find the file.
@@ -203,7 +619,7 @@ class Include(object):
         def _find_in(include_dir):
             """Returns True if the path is found."""
             file_hpath = path_normjoin(include_dir, self.hfile)
-            if os.path.isfile(file_hpath):
+            if isfile(file_hpath):
                 self.hpath = file_hpath
                 return True
             return False
@@ -211,9 +627,11 @@ class Include(object):
         if self.with_quotes and _find_in(cwd):
             return self.hpath, None
 
-        for package, patterns in include_patterns:
-            if any(x.match(self.hfile) for x in patterns):
-                return self.hfile, package
+        if not isinstance(include_patterns, IncludePatterns):
+            include_patterns = IncludePatterns(include_patterns)
+        package = include_patterns.match(self.hfile)
+        if package is not None:
+            return self.hfile, package
 
         direction = iter if self.with_quotes else reversed
         if any(_find_in(x) for x in direction(include_dirs)):
@@ -222,6 +640,10 @@ class Include(object):
         return None, None
 
 
+# The include directive scanners selectable by name.
+SCANNERS = {'text': Include.grep, 'bytes': Include.grep_bytes}
+
+
 class Component(object):
     """Representation of a component in a package.
 
@@ -236,7 +658,7 @@ class Component(object):
         includes_in_c: Include directives in the implementation file.
     """
 
-    def __init__(self, hpath, cpath, package):
+    def __init__(self, hpath, cpath, package, grep=Include.grep):
         """Initialization of a free-standing component.
 
         Warns about incomplete components.
@@ -245,20 +667,33 @@ class Component(object):
             hpath: The path to the header file of the component.
             cpath: The path to the implementation file of the component.
             package: The package this components belongs to.
+            grep: The include directive scanner for the files.
+        """
+        self.package = package
+        self.update(hpath, cpath, grep)
+
+    def update(self, hpath, cpath, grep=Include.grep):
+        """Sets the component files and scans their include directives.
+
+        The dependency components are reset to be located again.
+
+        Args:
+            hpath: The path to the header file of the component.
+            cpath: The path to the implementation file of the component.
+            grep: The include directive scanner for the files.
         """
         assert hpath or cpath
         self.name = path_to_posix_sep(
-            strip_ext(os.path.relpath(cpath or hpath, package.root)))
+            strip_ext(os.path.relpath(cpath or hpath, self.package.root)))
         if not hpath:
             warn('incomplete component: missing header: %s in %s.%s' %
-                 (self.name, package.group.name, package.name))
+                 (self.name, self.package.group.name, self.package.name))
         self.hpath = hpath
         self.cpath = cpath
-        self.package = package
         self.working_dir = os.path.dirname(cpath or hpath)
         self.dep_components = set()
-        self.includes_in_h = set() if not hpath else list(Include.grep(hpath))
-        self.includes_in_c = set() if not cpath else list(Include.grep(cpath))
+        self.includes_in_h = set() if not hpath else list(grep(hpath))
+        self.includes_in_c = set() if not cpath else list(grep(cpath))
         self.__sanitize_includes()
 
     def __str__(self):
@@ -330,6 +765,60 @@ class ExternalComponent(object):
         self.package = package
 
 
+class _PathTrie(object):
+    """Trie of files keyed by their reversed path components.
+
+    The depth of the deepest common node of two files
+    is the number of their consecutive common ancestors.
+    Every node keeps the files of its subtree in the insertion order
+    and skips the taken ones only once.
+    """
+
+    __slots__ = ['children', 'files', 'first']
+
+    def __init__(self):
+        """Initializes an empty node."""
+        self.children = {}  # {path component: _PathTrie}
+        self.files = []  # The files of the subtree.
+        self.first = 0  # The position of the first available file.
+
+    def insert(self, src_file):
+        """Adds the file to the nodes on its reversed path."""
+        node = self
+        node.files.append(src_file)
+        for name in src_file.rev_path:
+            node = node.children.setdefault(name, _PathTrie())
+            node.files.append(src_file)
+
+    def path(self, rev_path):
+        """Returns the nodes of the consecutive common path components."""
+        nodes = []
+        node = self
+        for name in rev_path:
+            node = node.children.get(name)
+            if node is None:
+                break
+            nodes.append(node)
+        return nodes
+
+    def take(self, taken_paths):
+        """Takes the first available file of the subtree.
+
+        Args:
+            taken_paths: The set of the paths of the taken files.
+
+        Returns:
+            The file added to the taken paths or None.
+        """
+        while self.first < len(self.files):
+            src_file = self.files[self.first]
+            self.first += 1
+            if src_file.path not in taken_paths:
+                taken_paths.add(src_file.path)
+                return src_file
+        return None
+
+
 class Package(object):
     """A collection of components.
 
@@ -341,6 +830,8 @@ class Package(object):
         group: The package group this package belongs to.
         root: The common root path for all the paths in the package.
         components: The list of unique components in this package.
+        translation_units: The implementation files of the package
+            from a compilation database instead of the source directories.
     """
 
     _RE_SRC = re.compile(r'(?i)[\w\-]+((?P<h>(\.h(h|xx|\+\+|pp)?)?)|'
@@ -375,6 +866,7 @@ class Package(object):
         self.__init_paths(src_paths, include_paths, alias_paths, ignore_paths)
         self.root = path_common(self.src_paths)
         self.components = []
+        self.translation_units = None
         self.__dep_packages = None  # set of dependency packages
         group.add_package(self)
 
@@ -406,7 +898,7 @@ class Package(object):
         _update(self.alias_paths, alias_paths)
         self.alias_paths.update(self.include_paths)
 
-    def construct_components(self):
+    def construct_components(self, grep=Include.grep, component_files=None):
         """Traverses the package paths and constructs package components.
 
         Even though John Lakos defined a component as a pair of h and c files,
@@ -420,49 +912,87 @@ class Package(object):
         are counted as components by default.
 
         Unpaired c files are counted as incomplete components with warnings.
+
+        Args:
+            grep: The include directive scanner for the component files.
+            component_files: Pre-found (hpath, cpath) pairs of the package
+                in the order of find_component_files.
+        """
+        if component_files is None:
+            component_files = Package.find_component_files(
+                self.src_paths, self.ignore_paths,
+                translation_units=self.translation_units)
+        self.components.extend(
+            Component(hpath, cpath, self, grep)
+            for hpath, cpath in component_files)
+
+    @staticmethod
+    def find_component_files(src_paths, ignore_paths, dir_paths=None,
+                             translation_units=None):
+        """Finds and pairs component header and implementation files.
+
+        Args:
+            src_paths: The absolute source paths (glob patterns).
+            ignore_paths: The absolute exclusion paths (glob patterns).
+            dir_paths: An optional set to collect the traversed directories.
+            translation_units: The implementation files to pair
+                instead of the ones in the source directories.
+
+        Returns:
+            A list of (hpath, cpath) with None for a missing file.
+        """
+        return list(
+            Package.pair_files(*Package.find_source_files(
+                src_paths, ignore_paths, dir_paths, translation_units)))
+
+    @staticmethod
+    def find_source_files(src_paths, ignore_paths, dir_paths=None,
+                          translation_units=None):
+        """Finds header and implementation files to be paired.
+
+        Args:
+            src_paths: The absolute source paths (glob patterns).
+            ignore_paths: The absolute exclusion paths (glob patterns).
+            dir_paths: An optional set to collect the traversed directories.
+            translation_units: The existing implementation files
+                are taken from this list instead of the source directories
+                except for the included implementation files (.ipp).
+
+        Returns:
+            The header and implementation files by their names
+            without extensions.
         """
-        file_type = collections.namedtuple('File', ['rev_path', 'path'])
         hpaths = collections.defaultdict(list)
         cpaths = collections.defaultdict(list)
+        is_ignored = glob_matcher(ignore_paths)
+        all_cfiles = translation_units is None
+        for glob_path in sorted(src_paths):
+            for src_path in glob.iglob(glob_path):
+                file_paths = (walk_file_paths(src_path, is_ignored, dir_paths)
+                              if os.path.isdir(src_path) else (src_path,))
+                for file_path in file_paths:
+                    _add_source_file(file_path, is_ignored, hpaths, cpaths,
+                                     all_cfiles)
 
-        # This approach is pessimistic with O(N*logN) instead of O(N)
-        # because it assumes the header and implementation files
-        # are likely to be in different directories.
-        def _reverse(path):
-            path = strip_ext(path).split(os.path.sep)
-            path.reverse()
-            return path
-
-        def _select_src_file(root, filename):
-            full_path = os.path.join(root, filename)
-            if any(fnmatch.fnmatch(full_path, x) for x in self.ignore_paths):
-                return
-            src_match = Package._RE_SRC.match(filename)
-            if src_match:
-                src_container = hpaths if src_match.group('h') else cpaths
-                src_container[strip_ext(filename)].append(
-                    file_type(_reverse(full_path), full_path))
-
-        def _gather_files(dir_path):
-            for root, _, files in os.walk(dir_path):
-                if any(fnmatch.fnmatch(root, x) for x in self.ignore_paths):
-                    continue
-                for filename in files:
-                    _select_src_file(root, filename)
+        for cpath in translation_units or ():
+            if os.path.isfile(cpath):
+                cpaths[strip_ext(os.path.basename(cpath))].append(
+                    _SourceFile(_reverse_path(cpath), cpath))
 
-        for glob_path in self.src_paths:
-            for src_path in glob.iglob(glob_path):
-                if os.path.isdir(src_path):
-                    _gather_files(src_path)
-                else:
-                    _select_src_file(*os.path.split(src_path))
+        return hpaths, cpaths
+
+    @staticmethod
+    def pair_files(hpaths, cpaths):
+        """Pairs header and implementation files into components.
 
-        self.__pair_files(hpaths, cpaths)
+        Args:
+            hpaths: The header files found by find_source_files.
+            cpaths: The implementation files found by find_source_files.
 
-    def __pair_files(self, hpaths, cpaths):
-        """Pairs header and implementation files into components."""
+        Yields:
+            (hpath, cpath) with None for a missing file.
+        """
 
-        # This should probably be solved with a graph algorithm.
         # Find the nodes with the longest matching consecutive ancestors
         # starting from the node (not the root!).
         # The nodes represent the file and directory names.
@@ -471,47 +1001,55 @@ class Package(object):
         # if multiple nodes share the same common ancestors of the same number.
         # Therefore, the algorithm to find
         # the lowest common ancestor seems to lead to false answers.
-        def _num_consecutive_ancestors(file_one, file_two):
-            return sum(1
-                       for _ in itertools.takewhile(lambda x: x[0] == x[1],
-                                                    zip(file_one.rev_path,
-                                                        file_two.rev_path)))
-
+        #
+        # The c files are paired in the descending order
+        # of the numbers of common ancestors with all the h files,
+        # i.e., the numbers of h files in the trie nodes on the c file path
+        # starting from the deepest node.
+        # Each c file takes the available h file
+        # of the longest match and the greatest reversed path.
         def _pair(hfiles, cfiles):
-            assert hfiles and cfiles  # Expected to have few elements.
-            candidates = [(x,
-                           sorted(
-                               ((_num_consecutive_ancestors(x, y), y)
-                                for y in hfiles),
-                               reverse=True))
-                          for x in cfiles]
+            assert hfiles and cfiles
+            trie = _PathTrie()
+            for hfile in sorted(hfiles, reverse=True):
+                trie.insert(hfile)
+            candidates = [(x, trie.path(x.rev_path)) for x in cfiles]
+            max_depth = max(len(x) for _, x in candidates)
             candidates.sort(
-                reverse=True, key=lambda x: tuple(y for y, _ in x[1]))
-            for cfile, hfile_candidates in candidates:
-                for _, hfile in hfile_candidates:
-                    if hfile in hfiles:
+                reverse=True,
+                key=lambda x: (0,) * (max_depth - len(x[1])) + tuple(
+                    len(y.files) for y in reversed(x[1])))
+            taken_paths = set()
+            for cfile, nodes in candidates:
+                for node in reversed(nodes):
+                    hfile = node.take(taken_paths)
+                    if hfile is not None:
                         yield hfile.path, cfile.path
-                        hfiles.remove(hfile)
                         break
                 else:
                     yield None, cfile.path
 
             for hfile in hfiles:
-                yield hfile.path, None
+                if hfile.path not in taken_paths:
+                    yield hfile.path, None
 
         for filename, hfiles in hpaths.items():
             if filename not in cpaths:
-                self.components.extend(
-                    Component(x.path, None, self) for x in hfiles)
+                for hfile in hfiles:
+                    yield hfile.path, None
             else:
                 cfiles = cpaths[filename]
                 del cpaths[filename]
-                self.components.extend(
-                    Component(x, y, self) for x, y in _pair(hfiles, cfiles))
+                for hpath, cpath in _pair(hfiles, cfiles):
+                    yield hpath, cpath
 
         for cfiles in cpaths.values():
-            self.components.extend(
-                Component(None, x.path, self) for x in cfiles)
+            for cfile in cfiles:
+                yield None, cfile.path
+
+    def reset_dependencies(self):
+        """Resets dependency packages to be gathered again from components."""
+        self.__dep_packages = None
 
     def dependencies(self):
         """Returns dependency packages."""
@@ -554,6 +1092,10 @@ class PackageGroup(object):
         """For printing graph nodes."""
         return self.name
 
+    def reset_dependencies(self):
+        """Resets dependency groups to be gathered again from packages."""
+        self.__dep_groups = None
+
     def dependencies(self):
         """Returns dependency package groups."""
         if self.__dep_groups is None:
@@ -581,6 +1123,171 @@ class PackageGroup(object):
         self.packages[package.name] = package
 
 
+class _SourcePackages(object):
+    """Finder of the internal packages of source files by their paths.
+
+    The source files are found as in the walk of the package source paths.
+    """
+
+    def __init__(self, packages):
+        """Indexes the source paths of the packages.
+
+        Args:
+            packages: The packages in the order of priority.
+        """
+        self.__src_packages = {}  # {src_path: package}
+        self.__glob_packages = []  # [(src_path_pattern, package)]
+        self.__ignore_matchers = {}  # {package: glob_matcher}
+        for package in packages:
+            for src_path in package.src_paths:
+                if _RE_GLOB.search(src_path):
+                    self.__glob_packages.append((src_path, package))
+                else:
+                    self.__src_packages[src_path] = package
+
+    def find(self, src_file):
+        """Returns the package of the implementation file or None."""
+        src_match = Package._RE_SRC.match(os.path.basename(src_file))
+        if not src_match or src_match.group('h'):
+            return None
+        walked_paths = []  # The file and directories as in the walk.
+        for path in path_ancestors(src_file):
+            walked_paths.append(path)
+            package = self.__src_packages.get(path) or next(
+                (y for x, y in self.__glob_packages
+                 if fnmatch.fnmatch(path, x)), None)
+            if package is not None:
+                break
+        else:
+            return None
+        is_ignored = self.__ignore_matchers.get(package)
+        if is_ignored is None:
+            is_ignored = glob_matcher(package.ignore_paths)
+            self.__ignore_matchers[package] = is_ignored
+        if any(is_ignored(x) for x in walked_paths):
+            return None
+        return package
+
+
+def _find_component_files(package_paths):
+    """Process pool job to find component files of a package."""
+    return Package.find_component_files(*package_paths)
+
+
+def _component_files(components):
+    """Yields the paths to the files of the components."""
+    for component in components:
+        for path in (component.hpath, component.cpath):
+            if path:
+                yield path
+
+
+def _grep(scanner, preamble, max_lines, file_path):
+    """Process pool job to scan include directives in a source file.
+
+    Returns:
+        The list of include directives and the ScanInfo of the file.
+    """
+    scan = ScanInfo()
+    return list(SCANNERS[scanner](file_path, preamble, max_lines, scan)), scan
+
+
+class _GraphNode(object):
+    """Picklable stand-in for a graph node in process pool jobs."""
+
+    __slots__ = ['name', 'deps']
+
+    def __init__(self, name):
+        """Initializes the node without dependencies."""
+        self.name = name
+        self.deps = ()
+
+    def __str__(self):
+        """For printing graph nodes."""
+        return self.name
+
+    def dependencies(self):
+        """Returns dependency nodes."""
+        return self.deps
+
+
+def _graph_job(graph_name, nodes, dep_filter, is_external):
+    """Describes the dependency graph with indices of its nodes.
+
+    The nodes are indexed in the order of the Graph construction,
+    so the analysis of the description reports the same as of the graph.
+
+    Args:
+        graph_name: The name of the graph for the DOT file.
+        nodes: Graph internal nodes with dependencies.
+        dep_filter: A filter for node dependencies.
+        is_external: Predicate to determine if a Graph node is external.
+
+    Returns:
+        (graph_name, names, external flags,
+         internal node indices, dependency indices of internal nodes)
+    """
+    index = {}  # {node: index}
+    names = []
+    external = []
+
+    def _index(node):
+        if node not in index:
+            index[node] = len(names)
+            names.append(str(node))
+            external.append(is_external(node))
+        return index[node]
+
+    internal = []
+    dependencies = []
+    for node in nodes:
+        internal.append(_index(node))
+        dependencies.append(
+            [_index(x) for x in dep_filter(node.dependencies())])
+    return graph_name, names, external, internal, dependencies
+
+
+def _analyze_graph(backend, reduced_dependencies, dot_graphs, dot_options,
+                   job):
+    """Process pool job to analyze a dependency graph.
+
+    Args:
+        backend: The graph analysis backend.
+        reduced_dependencies: The dependency report mode of Graph.print_levels.
+        dot_graphs: The names of the graphs to write in DOT format.
+            If None, all the graphs are written.
+        dot_options: The keyword arguments of Graph.write_dot.
+        job: The description of the graph from _graph_job.
+
+    Returns:
+        The list of printer arguments of the report
+        and the phases of the Profile of the graph.
+    """
+    profile = Profile()
+    graph_name, names, external, internal, dependencies = job
+    nodes = [_GraphNode(name) for name in names]
+    for i, node_dependencies in zip(internal, dependencies):
+        nodes[i].deps = [nodes[j] for j in node_dependencies]
+    external_nodes = set(x for x, y in zip(nodes, external) if y)
+    digraph = Graph((nodes[i] for i in internal), iter,
+                    external_nodes.__contains__)
+    report = []
+
+    def _printer(*args):
+        report.append(args)
+
+    with profile.phase('analysis'):
+        digraph.analyze(backend)
+    with profile.phase('report'):
+        digraph.print_cycles(_printer)
+        digraph.print_levels(_printer, reduced_dependencies)
+        digraph.print_summary(_printer)
+    if dot_graphs is None or graph_name in dot_graphs:
+        with profile.phase('dot'):
+            digraph.write_dot(graph_name, **dot_options)
+    return report, profile.phases
+
+
 class DependencyAnalysis(object):
     """Analysis of dependencies with package groups/packages/components.
 
@@ -593,15 +1300,38 @@ class DependencyAnalysis(object):
         include_dirs: Directories to search for included headers.
             It is ordered,
             starting from internal and ending with external directories.
+        include_cache: The persistent cache of scanned include directives.
+        jobs: The number of processes for source files and graphs.
+        scanner: The name of the include directive scanner in SCANNERS.
+        preamble: Scan only the preambles of source files.
+        max_preamble_lines: The optional limit of preamble lines to scan.
+        locate_hits: The number of include directives resolved from memory.
+        locate_misses: The number of include directive searches.
+        profile: The optional Profile of the analysis phases.
+        validation_cache: The persistent cache of valid configurations.
     """
 
-    def __init__(self, config_file):
+    def __init__(self, config_file, include_cache=None, jobs=1,
+                 scanner='text', preamble=False, max_preamble_lines=None,
+                 profile=None, validation_cache=None, compile_commands=None):
         """Initializes analysis containers.
 
         Args:
             config_file: The path to the configuration file.
+            include_cache: An optional IncludeCache for source file scanning.
+            jobs: The number of worker processes for source files and graphs.
+            scanner: The name of the include directive scanner.
+            preamble: Stop scanning source files after their preambles.
+            max_preamble_lines: The maximum number of preamble lines to scan.
+            profile: The Profile to record the phases and counters into.
+            validation_cache: An optional ValidationCache
+                to skip the validation of unchanged configuration files.
+            compile_commands: The path to a compilation database
+                with the implementation files and include directories
+                of the internal packages.
 
         Raises:
+            IOError: The compilation database is not readable.
             YAMLError: Errors loading yaml files.
             SchemaError: The config file is malformed or invalid.
             InvalidArgumentError: The configuration has is invalid values.
@@ -610,14 +1340,34 @@ class DependencyAnalysis(object):
         self.external_groups = {}
         self.internal_groups = {}
         self.include_dirs = []
+        self.include_cache = include_cache
+        self.jobs = jobs
+        if scanner not in SCANNERS:
+            raise InvalidArgumentError('%s is not an include scanner.' %
+                                       scanner)
+        self.scanner = scanner
+        self.preamble = preamble
+        self.max_preamble_lines = max_preamble_lines
+        self.locate_hits = 0
+        self.locate_misses = 0
+        self.profile = profile
+        self.validation_cache = validation_cache
         self._external_components = {}  # {hpath: ExternalComponent}
         self._internal_components = {}  # {hpath: Component}
-        self.__package_aliases = []  # Sorted [(alias_path, external_package)]
-        self.__include_patterns = []  # [(package, [regex])]
-        self.__parse_config(config_file)
-        self.__gather_include_dirs()
-        self.__gather_aliases()
-        self.__gather_include_patterns()
+        self.__package_aliases = {}  # {alias_path: external_package}
+        self.__include_patterns = None  # IncludePatterns
+        self.__file_index = FileIndex()
+        # {(hfile, with_quotes, working_dir): (hpath, package)}
+        self.__resolutions = {}
+        self.__source_dirs = None  # {dir_path: [internal_package]}
+        with phase(self.profile, 'configuration'):
+            self.__parse_config(config_file)
+            self.__gather_include_dirs()
+            self.__gather_aliases()
+            self.__gather_include_patterns()
+        if compile_commands:
+            with phase(self.profile, 'compile commands'):
+                self.__read_compile_commands(compile_commands)
         self.make_components()
 
     def __parse_config(self, config_file_path):
@@ -631,10 +1381,18 @@ class DependencyAnalysis(object):
             SchemaError: The configuration file is malformed or invalid.
             InvalidArgumentError: The configuration has invalid values.
         """
-        # Load before validation to check for well-formed YAML.
-        with open(config_file_path) as config_file:
-            self.config = safe_load(config_file)
-        Validator(config_file_path, [_SCHEMA_FILE]).validate()
+        from yaml import safe_load  # pylint: disable=import-outside-toplevel
+
+        with open(config_file_path, 'rb') as config_file:
+            content = config_file.read()
+        self.config = safe_load(content)
+        if self.validation_cache is None:
+            schema.validate(self.config, schema.load_schema())
+        else:
+            digest = schema.digest(content)
+            if digest not in self.validation_cache:
+                schema.validate(self.config, schema.load_schema())
+                self.validation_cache.add(digest)
 
         for pkg_group_config in self.config['internal']:
             DependencyAnalysis.__add_package_group(pkg_group_config,
@@ -686,19 +1444,141 @@ class DependencyAnalysis(object):
         """Gathers aliases for *external* packages lazy include search."""
         for group in self.external_groups.values():
             for package in group.packages.values():
-                self.__package_aliases.extend(
-                    (x, package) for x in package.alias_paths)
-        self.__package_aliases.sort()
-        assert (len(set(x for x, _ in self.__package_aliases)) == len(
-            self.__package_aliases)), "Ambiguous aliases to packages"
+                for alias_path in package.alias_paths:
+                    assert alias_path not in self.__package_aliases, (
+                        "Ambiguous aliases to packages")
+                    self.__package_aliases[alias_path] = package
 
     def __gather_include_patterns(self):
-        """Gathers and compiles include patterns into regex objects."""
-        for group in self.external_groups.values():
-            for package in group.packages.values():
-                self.__include_patterns.append(
-                    (package,
-                     [re.compile(x) for x in package.include_patterns]))
+        """Gathers and compiles include patterns into a matcher."""
+        self.__include_patterns = IncludePatterns(
+            (package, [re.compile(x) for x in package.include_patterns])
+            for group in self.external_groups.values()
+            for package in group.packages.values())
+
+    def __read_compile_commands(self, file_path):
+        """Maps a compilation database onto the internal packages.
+
+        The compiled files in the source paths of the internal packages
+        become their translation units.
+        The include directories of these files
+        are searched after the configured internal or external directories
+        if they are in an internal package group or an external package.
+
+        Args:
+            file_path: The path to the compile_commands.json file.
+
+        Raises:
+            IOError: The file is not readable.
+            InvalidArgumentError: The file is not a compilation database.
+        """
+        for package in self.internal_packages:
+            package.translation_units = []
+        src_packages = _SourcePackages(self.internal_packages)
+        num_commands = 0
+        dir_cache = {}  # Shared by the commands with the same flags.
+        translation_units = set()
+        include_dirs = collections.OrderedDict(
+            (x, False) for x in self.include_dirs)  # {dir_path: is_new}
+        try:
+            for command in compdb.read_commands(file_path):
+                num_commands += 1
+                src_file = compdb.source_path(command)
+                package = src_packages.find(src_file)
+                if package is None or src_file in translation_units:
+                    continue
+                translation_units.add(src_file)
+                package.translation_units.append(src_file)
+                for include_dir in compdb.include_dirs(command, dir_cache):
+                    include_dirs.setdefault(include_dir, True)
+        except ValueError as err:
+            raise InvalidArgumentError(str(err))
+        self.__add_include_dirs(x for x, y in include_dirs.items() if y)
+        logging.info('compile commands: %d translation units of %d commands',
+                     len(translation_units), num_commands)
+        if self.profile is not None:
+            self.profile.count('compile_commands', num_commands)
+            self.profile.count('translation_units', len(translation_units))
+
+    def __add_include_dirs(self, include_dirs):
+        """Adds the include directories of compile commands to the search.
+
+        The directories in an internal package group
+        are searched after the internal package directories,
+        and the directories in an external package are searched last.
+        Other directories are ignored.
+
+        Args:
+            include_dirs: The new include directories in the command order.
+        """
+        internal_dirs = []
+        external_dirs = []
+        for include_dir in include_dirs:
+            if any(x in self.__package_aliases
+                   for x in path_ancestors(include_dir)):
+                external_dirs.append(include_dir)
+            elif any(path_isancestor(x.path, include_dir)
+                     for x in self.internal_groups.values()):
+                internal_dirs.append(include_dir)
+            else:
+                logging.info('compile commands: ignoring %s '
+                             'outside the packages', include_dir)
+        num_internal = sum(
+            len(x.include_paths) for x in self.internal_packages)
+        self.include_dirs[num_internal:num_internal] = internal_dirs
+        self.include_dirs.extend(external_dirs)
+
+    def grep(self, file_path):
+        """Scans include directives in a source file through the cache.
+
+        Args:
+            file_path: The full path to the source file.
+
+        Returns:
+            The list of include directives in the file.
+        """
+        grep = functools.partial(SCANNERS[self.scanner],
+                                 preamble=self.preamble,
+                                 max_lines=self.max_preamble_lines)
+        entry = (None if self.include_cache is None else
+                 self.include_cache.lookup(file_path))
+        if entry is None:
+            scan = ScanInfo()
+            includes = self.__count_scan(list(grep(file_path, scan=scan)),
+                                         scan)
+            if self.include_cache is not None:
+                self.include_cache.put(file_path, includes, scan)
+        else:
+            includes, scan = entry
+        if scan is not None:
+            scan.report(file_path)
+        return includes
+
+    def __count_scan(self, includes, scan):
+        """Counts the file read by a scanner and returns its includes."""
+        if self.profile is not None:
+            self.profile.count('files_read')
+            self.profile.count('bytes_read', scan.bytes_read)
+            self.profile.count('include_directives', len(includes))
+        return includes
+
+    def __count_lookups(self):
+        """Records the counters of the include resolution.
+
+        The include search queries the file index
+        listing the directories instead of the stat calls per file,
+        so the queries and listings are counted instead of the stat calls.
+        """
+        if self.profile is None:
+            return
+        counters = self.profile.counters
+        counters['file_index_queries'] = self.__file_index.lookups
+        counters['file_index_listings'] = self.__file_index.listings
+        counters['locate_hits'] = self.locate_hits
+        counters['locate_misses'] = self.locate_misses
+        if self.include_cache is not None:
+            counters['include_cache_hits'] = self.include_cache.hits
+            counters['include_cache_misses'] = self.include_cache.misses
 
     def locate(self, include, component):
         """Locates the dependency component.
@@ -715,14 +1595,27 @@ class DependencyAnalysis(object):
         """
 
         def _find_external_package(hpath):
-            for path, package in reversed(self.__package_aliases):
-                if path_isancestor(path, hpath):
-                    return package
+            for path in path_ancestors(hpath):  # The longest alias first.
+                if path in self.__package_aliases:
+                    return self.__package_aliases[path]
             raise AnalysisError('include error: Cannot associate '
                                 '%s file with any component.' % hpath)
 
-        hpath, package = include.locate(
-            component.working_dir, self.include_dirs, self.__include_patterns)
+        # Only quoted directives depend on the directory of the includer.
+        key = (include.hfile, include.with_quotes,
+               component.working_dir if include.with_quotes else None)
+        resolution = self.__resolutions.get(key)
+        if resolution is None:
+            self.locate_misses += 1
+            resolution = include.locate(
+                component.working_dir, self.include_dirs,
+                self.__include_patterns, self.__file_index.isfile)
+            self.__resolutions[key] = resolution
+        else:
+            self.locate_hits += 1
+            if resolution[1] is None:  # Not a pattern match.
+                include.hpath = resolution[0]
+        hpath, package = resolution
 
         if hpath is None:
             return False
@@ -748,57 +1641,392 @@ class DependencyAnalysis(object):
                 for component in package.components:
                     yield component
 
+    @property
+    def internal_packages(self):
+        """Yields packages in internal groups."""
+        for group in self.internal_groups.values():
+            for package in group.packages.values():
+                yield package
+
     def make_components(self):
         """Pairs hfiles and cfiles.
 
         Raises:
             AnalysisError: Misconfiguration or failure of the analysis.
         """
-        for group in self.internal_groups.values():
-            for package in group.packages.values():
-                package.construct_components()
+        packages = list(self.internal_packages)
+        if self.jobs > 1:
+            self.__construct_components_in_parallel(packages)
+        else:
+            for package in packages:
+                with phase(self.profile, 'discovery'):
+                    source_files = Package.find_source_files(
+                        package.src_paths, package.ignore_paths,
+                        translation_units=package.translation_units)
+                with phase(self.profile, 'pairing'):
+                    component_files = list(Package.pair_files(*source_files))
+                with phase(self.profile, 'scanning'):
+                    package.construct_components(self.grep, component_files)
 
         for component in self.internal_components:
-            id_path = component.hpath or component.cpath
-            self._internal_components[id_path] = component
-            if component.cpath and component.cpath.endswith('.ipp'):
-                self._internal_components[component.cpath] = component
+            self.__register_component(component)
+
+        with phase(self.profile, 'resolution'):
+            for component in self.internal_components:
+                self.__locate_dependencies(component)
+        self.__count_lookups()
+
+    def __register_component(self, component):
+        """Registers the component under the paths of its files."""
+        id_path = component.hpath or component.cpath
+        self._internal_components[id_path] = component
+        if component.cpath and component.cpath.endswith('.ipp'):
+            self._internal_components[component.cpath] = component
+
+    def __unregister_component(self, component):
+        """Removes the registration of the component."""
+        for path in (component.hpath or component.cpath, component.cpath):
+            if self._internal_components.get(path) is component:
+                del self._internal_components[path]
+
+    def __locate_dependencies(self, component):
+        """Locates the dependency components of the component includes.
+
+        The includes located before (e.g., upon updates) are located anew.
+
+        Raises:
+            AnalysisError: Failure to associate a header to a component.
+        """
+        for include in itertools.chain(component.includes_in_h,
+                                       component.includes_in_c):
+            include.hpath = None
+            if not self.locate(include, component):
+                warn('include issues: header not found: %s' % str(include))
+
+    def source_identities(self):
+        """Identifies the internal source files and directories.
+
+        Polling for changes in the identities
+        finds modified and removed files
+        and directories with added or removed files.
+
+        Returns:
+            {path: (size, mtime_ns, inode)} of the existing component files
+            and traversed source directories.
+        """
+        if self.__source_dirs is None:
+            self.__source_dirs = {}
+            for package in self.internal_packages:
+                self.__find_component_files(package)
+        paths = itertools.chain(self.__source_dirs,
+                                _component_files(self.internal_components))
+        identities = {}
+        for path in paths:
+            try:
+                identities[path] = file_identity(os.stat(path))
+            except OSError:  # Removed.
+                continue
+        return identities
+
+    def __find_component_files(self, package):
+        """Finds component files and registers source dirs of the package.
+
+        Returns:
+            The list of component (hpath, cpath) files.
+        """
+        for dir_path, packages in list(self.__source_dirs.items()):
+            if package in packages:
+                packages.remove(package)
+                if not packages:
+                    del self.__source_dirs[dir_path]
+        dir_paths = set()
+        component_files = Package.find_component_files(
+            package.src_paths, package.ignore_paths, dir_paths,
+            package.translation_units)
+        for dir_path in dir_paths:
+            self.__source_dirs.setdefault(dir_path, []).append(package)
+        return component_files
+
+    def update(self, paths):
+        """Updates the analysis upon changes in the source files.
+
+        Only the changed files are scanned again,
+        and only the components with possibly affected dependencies
+        are located again.
+        Packages are searched for component files
+        only upon changes in their source directories.
+
+        Args:
+            paths: The changed paths from the source identities.
+
+        Returns:
+            The names of the graphs with changes as in 'analyze'.
 
+        Raises:
+            AnalysisError: Failure to associate a header to a component.
+        """
+        if self.__source_dirs is None:
+            self.source_identities()
+        changed_packages, modified_components = self.__classify_changes(paths)
+        dep_packages = {
+            x: set(x.dependencies())
+            for x in self.internal_packages
+        }
+        dep_groups = {
+            x: set(x.dependencies())
+            for x in self.internal_groups.values()
+        }
+        dep_components = {}  # {component: previous dependency components}
+        updated_packages = set()  # With changed components or dependencies.
+        removed_components = set()
+        changed_filenames = set()  # Added or removed file basenames.
+        for package in changed_packages:
+            old_components = package.components[:]
+            self.__update_package(package, modified_components,
+                                  dep_components)
+            if package.components == old_components:
+                continue
+            updated_packages.add(package)
+            removed_components.update(
+                set(old_components).difference(package.components))
+            added_or_removed = set(_component_files(package.components))
+            added_or_removed.symmetric_difference_update(
+                _component_files(old_components))
+            for path in added_or_removed:
+                changed_filenames.add(os.path.basename(path))
+                self.__file_index.invalidate(os.path.dirname(path))
+
+        for component in modified_components:
+            if component.package not in changed_packages:
+                dep_components[component] = component.dep_components
+                component.update(component.hpath, component.cpath, self.grep)
+
+        if changed_filenames:
+            for key in list(self.__resolutions):
+                if os.path.basename(key[0]) in changed_filenames:
+                    del self.__resolutions[key]
         for component in self.internal_components:
-            for include in itertools.chain(component.includes_in_h,
-                                           component.includes_in_c):
-                if not self.locate(include, component):
-                    warn('include issues: header not found: %s' % str(include))
-
-    def analyze(self, printer, args):
-        """Runs the analysis."""
-
-        def _analyze(graph_name, digraph):
-            digraph.analyze()
-            digraph.print_cycles(printer)
-            if not args.l and not args.L:
-                digraph.print_levels(printer)
-            else:
-                digraph.print_levels(printer, args.l)
-            digraph.print_summary(printer)
-            digraph.write_dot(graph_name)
+            if component in dep_components:
+                continue
+            if (not removed_components.isdisjoint(component.dep_components) or
+                    changed_filenames and any(
+                        os.path.basename(x.hfile) in changed_filenames
+                        for x in itertools.chain(component.includes_in_h,
+                                                 component.includes_in_c))):
+                dep_components[component] = component.dep_components
+                component.dep_components = set()
+        for component in dep_components:
+            self.__locate_dependencies(component)
+
+        updated_packages.update(x.package
+                                for x, deps in dep_components.items()
+                                if deps != x.dep_components)
+        self.__count_lookups()
+        return DependencyAnalysis.__changed_graphs(updated_packages,
+                                                   dep_packages, dep_groups)
+
+    def __classify_changes(self, paths):
+        """Finds the packages and components affected by the changed paths.
+
+        The file index forgets the listings of the changed directories.
+
+        Args:
+            paths: The changed paths from the source identities.
+
+        Returns:
+            The set of packages to find the component files again
+            and the set of components with modified files.
+        """
+        file_components = {
+            path: component
+            for component in self.internal_components
+            for path in (component.hpath, component.cpath) if path
+        }
+        changed_packages = set()
+        modified_components = set()
+        for path in paths:
+            if path in self.__source_dirs:
+                changed_packages.update(self.__source_dirs[path])
+                self.__file_index.invalidate(path)
+            elif path in file_components:
+                if os.path.isfile(path):
+                    modified_components.add(file_components[path])
+                else:
+                    changed_packages.add(file_components[path].package)
+        return changed_packages, modified_components
+
+    @staticmethod
+    def __changed_graphs(updated_packages, dep_packages, dep_groups):
+        """Resets the dependencies of the updated packages and their groups.
+
+        Args:
+            updated_packages: The packages with changed components
+                or component dependencies.
+            dep_packages: {package: previous dependency packages}.
+            dep_groups: {group: previous dependency groups}.
+
+        Returns:
+            The names of the graphs with changes as in 'analyze'.
+        """
+        graphs = set()
+        for package in updated_packages:
+            graphs.add('_'.join((package.group.name, package.name)))
+            package.reset_dependencies()
+            if package.dependencies() != dep_packages[package]:
+                graphs.add(package.group.name)
+                package.group.reset_dependencies()
+        if any(group.dependencies() != deps
+               for group, deps in dep_groups.items()):
+            graphs.add('system')
+        return graphs
+
+    def __update_package(self, package, modified_components, dep_components):
+        """Finds the package component files again and updates components.
+
+        The existing components are updated in place
+        to keep them valid as dependencies of other components.
+
+        Args:
+            package: The package with changes in its source directories.
+            modified_components: The components with modified files.
+            dep_components: The destination dictionary
+                {component: previous dependency components or None if new}
+                for the updated components.
+        """
+        id_components = {x.hpath or x.cpath: x for x in package.components}
+        for component in package.components:
+            self.__unregister_component(component)
+        components = []
+        for hpath, cpath in self.__find_component_files(package):
+            component = id_components.pop(hpath or cpath, None)
+            if component is None:
+                component = Component(hpath, cpath, package, self.grep)
+                dep_components[component] = None
+            elif ((component.hpath, component.cpath) != (hpath, cpath) or
+                  component in modified_components):
+                dep_components[component] = component.dep_components
+                component.update(hpath, cpath, self.grep)
+            components.append(component)
+            self.__register_component(component)
+        package.components[:] = components
+
+    def __construct_components_in_parallel(self, packages):
+        """Finds and scans package source files with a pool of processes.
+
+        The components are constructed in the same order
+        and with the same diagnostics as in the serial construction.
 
-        if len(self.internal_groups) > 1:
+        Args:
+            packages: The internal packages to construct components for.
+        """
+        import multiprocessing  # pylint: disable=import-outside-toplevel
+        pool = multiprocessing.Pool(self.jobs)
+        try:
+            with phase(self.profile, 'discovery'):  # Including the pairing.
+                package_files = pool.map(
+                    _find_component_files,
+                    [(x.src_paths, x.ignore_paths, None, x.translation_units)
+                     for x in packages],
+                    chunksize=1)
+            with phase(self.profile, 'scanning'):
+                includes = {}  # {file_path: [Include]}
+                scans = {}  # {file_path: ScanInfo}
+                missed_paths = []
+                for component_files in package_files:
+                    for file_path in itertools.chain(*component_files):
+                        if not file_path or file_path in includes:
+                            continue
+                        entry = (None if self.include_cache is None else
+                                 self.include_cache.lookup(file_path))
+                        if entry is None:
+                            includes[file_path] = None
+                            missed_paths.append(file_path)
+                            continue
+                        includes[file_path], scans[file_path] = entry
+                chunksize = max(1, len(missed_paths) // (self.jobs * 4))
+                for file_path, (file_includes, scan) in zip(
+                        missed_paths,
+                        pool.imap(
+                            functools.partial(_grep, self.scanner,
+                                              self.preamble,
+                                              self.max_preamble_lines),
+                            missed_paths,
+                            chunksize=chunksize)):
+                    includes[file_path] = self.__count_scan(file_includes,
+                                                            scan)
+                    scans[file_path] = scan
+                    if self.include_cache is not None:
+                        self.include_cache.put(file_path, file_includes, scan)
+        finally:
+            pool.terminate()
+            pool.join()
+
+        def _get_includes(file_path):
+            """Reports the scan diagnostics in the serial order."""
+            scan = scans[file_path]
+            if scan is not None:
+                scan.report(file_path)
+            return includes[file_path]
+
+        for package, component_files in zip(packages, package_files):
+            package.construct_components(_get_includes, component_files)
+
+    def analyze(self, printer, args, graphs=None):
+        """Runs the analysis.
+
+        The graphs are analyzed with a pool of processes
+        if multiple jobs are requested.
+        The reports are printed in the same order regardless.
+
+        Args:
+            printer: The printer of the report.
+            args: The command-line arguments of the report.
+            graphs: The names of the graphs to analyze
+                ('system', group names, group_package names).
+                If None, all the graphs are analyzed.
+        """
+        headers, jobs = self.__graph_jobs(graphs)
+        # The reports go first to finish their generator with the pool.
+        for (report, phases), header, job in zip(
+                self.__graph_reports(jobs, args), headers, jobs):
             printer('\n' + '#' * 80)
-            printer('analyzing dependencies among all package groups ...')
-            _analyze('system',
-                     Graph(self.internal_groups.values(), iter,
+            printer(header)
+            for printer_args in report:
+                printer(*printer_args)
+            if self.profile is not None:
+                self.profile.merge(phases, 'graph %s: ' % job[0])
+
+    def __graph_jobs(self, graphs):
+        """Prepares the graphs for the analysis.
+
+        Args:
+            graphs: The names of the graphs to analyze as in 'analyze'.
+
+        Returns:
+            The report headers and _graph_job results of the graphs.
+        """
+        headers = []
+        jobs = []
+
+        def _selected(graph_name):
+            return graphs is None or graph_name in graphs
+
+        if len(self.internal_groups) > 1 and _selected('system'):
+            headers.append('analyzing dependencies among all package groups '
+                           '...')
+            jobs.append(
+                _graph_job('system', self.internal_groups.values(), iter,
                            lambda x: x.name in self.external_groups))
 
         for group_name, package_group in self.internal_groups.items():
-            if len(package_group.packages) > 1:
-                printer('\n' + '#' * 80)
-                printer('analyzing dependencies among packages in '
-                        'the specified package group %s ...' % group_name)
-                _analyze(group_name,
-                         Graph(package_group.packages.values(),
-                               lambda x: (i if i.group == package_group
-                                          else i.group for i in x),
+            if len(package_group.packages) > 1 and _selected(group_name):
+                headers.append('analyzing dependencies among packages in '
+                               'the specified package group %s ...' %
+                               group_name)
+                jobs.append(
+                    _graph_job(group_name, package_group.packages.values(),
+                               lambda x: (i if i.group == package_group else
+                                          i.group for i in x),
                                lambda x: isinstance(x, PackageGroup)))
 
         for group_name, package_group in self.internal_groups.items():
@@ -806,12 +2034,47 @@ class DependencyAnalysis(object):
                 if not package.components:
                     assert not package.src_paths
                     continue
-                printer('\n' + '#' * 80)
-                printer('analyzing dependencies among components in '
-                        'the specified package %s.%s ...' % (group_name,
-                                                             pkg_name))
-                _analyze('_'.join((group_name, pkg_name)),
-                         Graph(package.components,
-                               lambda x: (i if i.package == package
-                                          else i.package for i in x),
+                if not _selected('_'.join((group_name, pkg_name))):
+                    continue
+                headers.append('analyzing dependencies among components in '
+                               'the specified package %s.%s ...' %
+                               (group_name, pkg_name))
+                jobs.append(
+                    _graph_job('_'.join((group_name, pkg_name)),
+                               package.components,
+                               lambda x: (i if i.package == package else
+                                          i.package for i in x),
                                lambda x: isinstance(x, Package)))
+        return headers, jobs
+
+    def __graph_reports(self, jobs, args):
+        """Analyzes the graphs serially or with a pool of processes.
+
+        Args:
+            jobs: The _graph_job results of the graphs.
+            args: The command-line arguments of the report.
+
+        Yields:
+            The _analyze_graph results in the order of the jobs.
+        """
+        dot_graphs = None
+        if args.no_dot:
+            dot_graphs = set()
+        elif args.dot_graph:
+            dot_graphs = set(args.dot_graph)
+        analyze_graph = functools.partial(
+            _analyze_graph, args.backend, args.l if args.l or args.L else None,
+            dot_graphs,
+            dict(cluster_cycles=args.dot_cycles, rank_levels=args.dot_levels))
+        if self.jobs <= 1 or len(jobs) <= 1:
+            for job in jobs:
+                yield analyze_graph(job)
+            return
+        import multiprocessing  # pylint: disable=import-outside-toplevel
+        pool = multiprocessing.Pool(min(self.jobs, len(jobs)))
+        try:
+            for report in pool.imap(analyze_graph, jobs):
+                yield report
+        finally:
+            pool.terminate()
+            pool.join()
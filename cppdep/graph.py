@@ -17,21 +17,290 @@
 
 A Python Graph API? http://wiki.python.org/moin/PythonGraphApi
 It seems that the best one is NetworkX(http://networkx.lanl.gov/).
+
+NetworkX and the optional NumPy/SciPy backend are imported on first use
+to keep the startup fast.
 """
 
 from __future__ import absolute_import, division
 
+from array import array
 import math
+import os.path
+
+try:
+    from importlib.util import find_spec
+except ImportError:  # Python 2
+    import imp
+
+    def find_spec(name):
+        """Finds the top-level module without importing it or returns None."""
+        try:
+            return imp.find_module(name)
+        except ImportError:
+            return None
+
+# NumPy and SciPy are optional.
+BACKENDS = (('python', 'scipy') if find_spec('numpy') and find_spec('scipy')
+            else ('python',))
+
+
+def popcount(bitset):
+    """Returns the number of set bits in a non-negative integer."""
+    return bin(bitset).count('1')
+
+
+if hasattr(int, 'bit_count'):  # Python 3.10+
+    popcount = int.bit_count  # pylint: disable=invalid-name
+
+
+def compressed_rows(num_nodes, sources, targets):
+    """Builds the compressed sparse row (CSR) adjacency of a graph.
+
+    The successors of node i are targets[offsets[i]:offsets[i + 1]].
+
+    Args:
+        num_nodes: The number of nodes indexed from 0.
+        sources: The source node indices of the edges.
+        targets: The target node indices of the edges.
+
+    Returns:
+        The offsets and targets arrays of the adjacency.
+    """
+    offsets = array('i', [0]) * (num_nodes + 1)
+    for i in sources:
+        offsets[i + 1] += 1
+    for i in range(num_nodes):
+        offsets[i + 1] += offsets[i]
+    positions = offsets[:-1]
+    row_targets = array('i', [0]) * len(targets)
+    for k, i in enumerate(sources):
+        row_targets[positions[i]] = targets[k]
+        positions[i] += 1
+    return offsets, row_targets
+
+
+def strongly_connected_components(offsets, targets):
+    """Finds strongly connected components with Tarjan's algorithm.
+
+    The depth-first search is iterative
+    to handle paths deeper than the recursion limit.
+
+    Args:
+        offsets: The CSR offsets of the graph adjacency.
+        targets: The CSR targets of the graph adjacency.
+
+    Returns:
+        The component index of each node and the number of components.
+        The components are indexed in reverse topological order.
+    """
+    num_nodes = len(offsets) - 1
+    discovery = array('i', [-1]) * num_nodes
+    lowlink = array('i', [0]) * num_nodes
+    component = array('i', [-1]) * num_nodes
+    stack = []  # Visited nodes without an assigned component.
+    num_discovered = 0
+    num_components = 0
+    for root in range(num_nodes):
+        if discovery[root] != -1:
+            continue
+        path = [(root, offsets[root])]  # [(node, next target position)]
+        discovery[root] = lowlink[root] = num_discovered
+        num_discovered += 1
+        stack.append(root)
+        while path:
+            v, k = path[-1]
+            end = offsets[v + 1]
+            while k < end:
+                w = targets[k]
+                k += 1
+                if discovery[w] == -1:
+                    path[-1] = (v, k)
+                    path.append((w, offsets[w]))
+                    discovery[w] = lowlink[w] = num_discovered
+                    num_discovered += 1
+                    stack.append(w)
+                    break
+                if component[w] == -1:
+                    lowlink[v] = min(lowlink[v], discovery[w])
+            else:
+                path.pop()
+                if path:
+                    u = path[-1][0]
+                    lowlink[u] = min(lowlink[u], lowlink[v])
+                if lowlink[v] == discovery[v]:
+                    while True:
+                        w = stack.pop()
+                        component[w] = num_components
+                        if w == v:
+                            break
+                    num_components += 1
+    return component, num_components
+
+
+def descendant_bitsets(offsets, targets):
+    """Traverses an acyclic graph in reverse topological order.
+
+    The descendants of nodes are kept as integer bitsets over the indices
+    and released as soon as all the predecessors of the node are visited.
+
+    Args:
+        offsets: The CSR offsets of nodes in topological order.
+        targets: The CSR targets of the graph adjacency.
+
+    Yields:
+        (index, descendants, children) of the nodes in reverse order
+        with the bitsets of all proper descendants of the node successors
+        and the successors themselves.
+    """
+    num_nodes = len(offsets) - 1
+    num_pending_predecessors = array('i', [0]) * num_nodes
+    for j in targets:
+        num_pending_predecessors[j] += 1
+    descendants = {}  # {index: bitset} of nodes with pending predecessors.
+    for i in reversed(range(num_nodes)):
+        reachable = 0
+        children = 0
+        for j in targets[offsets[i]:offsets[i + 1]]:
+            reachable |= descendants[j]
+            children |= 1 << j
+            num_pending_predecessors[j] -= 1
+            if not num_pending_predecessors[j]:
+                del descendants[j]
+        yield i, reachable, children
+        if num_pending_predecessors[i]:
+            descendants[i] = reachable | children
+
+
+def subgraph_rows(offsets, targets, subgraph):
+    """Builds the CSR adjacency of a subgraph closed under successors.
+
+    Args:
+        offsets: The CSR offsets of the graph adjacency.
+        targets: The CSR targets of the graph adjacency.
+        subgraph: The node indices of the subgraph.
+
+    Returns:
+        The offsets and targets arrays of the subgraph adjacency
+        with the nodes indexed by their position in the subgraph.
+    """
+    local = {i: k for k, i in enumerate(subgraph)}
+    subgraph_offsets = array('i', [0])
+    subgraph_targets = array('i')
+    for i in subgraph:
+        subgraph_targets.extend(
+            local[j] for j in targets[offsets[i]:offsets[i + 1]])
+        subgraph_offsets.append(len(subgraph_targets))
+    return subgraph_offsets, subgraph_targets
+
+
+def replace_rows(offsets, targets, rows, mask=None):
+    """Replaces the rows of the CSR adjacency.
+
+    Args:
+        offsets: The CSR offsets of the graph adjacency.
+        targets: The CSR targets of the graph adjacency.
+        rows: {index: successor indices} of the replaced rows.
+        mask: The optional bytearray aligned with the targets.
+            The new targets are masked with 1.
+
+    Returns:
+        The new offsets, targets, and mask.
+    """
+    new_offsets = array('i', [0])
+    new_targets = array('i')
+    new_mask = None if mask is None else bytearray()
+    next_row = 0  # The first row after the last replaced one.
+    for i in sorted(rows) + [len(offsets) - 1]:
+        start, end = offsets[next_row], offsets[i]
+        shift = len(new_targets) - start
+        new_offsets.extend(x + shift for x in offsets[next_row + 1:i + 1])
+        new_targets.extend(targets[start:end])
+        if mask is not None:
+            new_mask += mask[start:end]
+        if i in rows:
+            new_targets.extend(rows[i])
+            new_offsets.append(len(new_targets))
+            if mask is not None:
+                new_mask += bytearray([1]) * len(rows[i])
+        next_row = i + 1
+    return new_offsets, new_targets, new_mask
+
+
+def reachable_nodes(offsets, targets, roots):
+    """Returns the indices of the nodes reachable from the roots."""
+    visited = bytearray(len(offsets) - 1)
+    stack = list(roots)
+    for i in stack:
+        visited[i] = 1
+    result = []
+    while stack:
+        i = stack.pop()
+        result.append(i)
+        for j in targets[offsets[i]:offsets[i + 1]]:
+            if not visited[j]:
+                visited[j] = 1
+                stack.append(j)
+    return result
+
+
+def dot_id(name):
+    """Returns the quoted Graphviz DOT identifier of the name."""
+    return '"%s"' % str(name).replace('\\', '\\\\').replace(
+        '"', '\\"').replace('\n', '\\n')
+
+
+class Cycle(object):
+    """Strongly connected nodes standing in for them in the condensed graph.
+
+    Cycles are compared by identity.
+    """
+
+    __slots__ = ('__nodes', '__edges')
+
+    def __init__(self, nodes, edges):
+        """Initializes the cycle.
+
+        Args:
+            nodes: The member nodes of the cycle.
+            edges: The edges among the member nodes.
+        """
+        self.__nodes = tuple(nodes)
+        self.__edges = tuple(edges)
+
+    def __iter__(self):
+        """Iterates over the member nodes."""
+        return iter(self.__nodes)
+
+    def __len__(self):
+        """Returns the number of member nodes."""
+        return len(self.__nodes)
+
+    def nodes(self):
+        """Returns the member nodes."""
+        return self.__nodes
+
+    def edges(self):
+        """Returns the edges among the member nodes."""
+        return self.__edges
+
+    def number_of_nodes(self):
+        """Returns the number of member nodes."""
+        return len(self.__nodes)
 
-import networkx as nx
-from networkx.drawing.nx_pydot import write_dot
+    def number_of_edges(self):
+        """Returns the number of edges among the member nodes."""
+        return len(self.__edges)
 
 
 class Graph(object):
     """Graph for dependency analysis among its nodes.
 
-    Attributes:
-        digraph: The underlying directed graph without self-loops.
+    The nodes are indexed in the order of addition,
+    and the edges are kept in compressed sparse row arrays of the indices.
+    The transitive reduction masks the redundant edges
+    instead of removing them
+    so that the analysis can be updated upon edge changes.
     """
 
     def __init__(self, nodes, dep_filter=iter, is_external=lambda _: False):
@@ -47,135 +316,383 @@ class Graph(object):
             dep_filter: A filter for node dependencies.
             is_external: Predicate to determine if a Graph node is external.
         """
-        self.digraph = nx.DiGraph()
-        self.cycles = {}  # {cyclic_graph: ([pre_edge], [suc_edge])}
-        self.cycle2index = {}  # {cyclic_graph: cycle_index}
-        self.node2cycle = {}  # {node: cyclic_graph}
+        self.cycles = []  # [cycle] in the report order.
+        self.cycle2index = {}  # {cycle: cycle_index}
+        self.node2cycle = {}  # {node: cycle}
         self.node2cd = {}  # {node: cd}
         self.node2level = {}  # {node: level}
         self.__dep_filter = dep_filter
         self.__is_external = is_external
+        self.__nodes = []  # [node] by index
+        self.__index = {}  # {node: index}
+        self.__backend = BACKENDS[0]  # The backend of the last analysis.
+        self.__kept = None  # The mask of the reduced edges after the analysis.
+        self.__predecessors = None  # The reverse CSR upon edge updates.
+        sources = array('i')
+        targets = array('i')
         for node in nodes:
             assert not self.__is_external(node)
-            self.digraph.add_node(node)
-            for dependency in self.__dep_filter(node.dependencies()):
-                assert node != dependency
-                self.digraph.add_edge(node, dependency)
+            i = self.__add_node(node)
+            for j in set(
+                    self.__add_node(x)
+                    for x in self.__dep_filter(node.dependencies())):
+                assert i != j
+                sources.append(i)
+                targets.append(j)
+        self.__offsets, self.__targets = compressed_rows(
+            len(self.__nodes), sources, targets)
+
+    def __add_node(self, node):
+        """Returns the index of the node added if new."""
+        i = self.__index.get(node)
+        if i is None:
+            i = self.__index[node] = len(self.__nodes)
+            self.__nodes.append(node)
+        return i
+
+    def number_of_nodes(self):
+        """Returns the number of nodes in the graph."""
+        return len(self.__nodes)
+
+    def number_of_edges(self):
+        """Returns the number of edges in the graph."""
+        if self.__kept is None:
+            return len(self.__targets)
+        return self.__kept.count(b'\x01')
+
+    def nodes(self):
+        """Returns the graph nodes in the order of addition."""
+        return list(self.__nodes)
+
+    def __successor_indices(self, i):
+        """Generates the indices of the successors of the node index."""
+        start, end = self.__offsets[i], self.__offsets[i + 1]
+        if self.__kept is None:
+            return iter(self.__targets[start:end])
+        return (self.__targets[k] for k in range(start, end)
+                if self.__kept[k])
+
+    def successors(self, node):
+        """Generates the successors of the node."""
+        for j in self.__successor_indices(self.__index[node]):
+            yield self.__nodes[j]
+
+    def edges(self):
+        """Generates the (source, target) edges of the graph."""
+        for i, node in enumerate(self.__nodes):
+            for j in self.__successor_indices(i):
+                yield node, self.__nodes[j]
+
+    def to_networkx(self):
+        """Returns the graph as a NetworkX digraph."""
+        import networkx as nx  # pylint: disable=import-outside-toplevel
+        digraph = nx.DiGraph()
+        digraph.add_nodes_from(self.__nodes)
+        digraph.add_edges_from(self.edges())
+        return digraph
+
+    def __condensation(self, subgraph=None):
+        """Condenses cycles into single nodes without modifying the graph.
 
-    # pylint: disable=invalid-name
-    def __transitive_reduction(self):
-        """Transitive reduction for acyclic graphs."""
-        assert nx.is_directed_acyclic_graph(self.digraph)
-        for u in self.digraph:
-            transitive_vertex = []
-            for v in self.digraph[u]:
-                transitive_vertex.extend(
-                    x for _, x in nx.dfs_edges(self.digraph, v))
-            self.digraph.remove_edges_from((u, x) for x in transitive_vertex)
-
-    def __condensation(self):
-        """Produces condensation of cyclic graphs."""
-        subgraphs = nx.strongly_connected_component_subgraphs(self.digraph)
-        for subgraph in list(subgraphs):
-            if subgraph.number_of_nodes() == 1:
-                continue  # not a cycle
-            pre_edges = []
-            suc_edges = []
-            for node in subgraph:
-                assert node not in self.node2cycle
-                assert node in self.digraph  # no accidental copying
-                self.node2cycle[node] = subgraph
-                for pre_node in self.digraph.predecessors(node):
-                    if not subgraph.has_node(pre_node):
-                        pre_edges.append((pre_node, node))
-                        self.digraph.add_edge(pre_node, subgraph)
-                for suc_node in self.digraph.successors(node):
-                    if not subgraph.has_node(suc_node):
-                        suc_edges.append((node, suc_node))
-                        self.digraph.add_edge(subgraph, suc_node)
-                self.digraph.remove_node(node)
-            assert subgraph not in self.cycles
-            self.cycles[subgraph] = (pre_edges, suc_edges)
-
-        cycle_order = lambda x: min(str(u) for u in x)
-        for index, cycle in enumerate(sorted(self.cycles, key=cycle_order)):
+        Args:
+            subgraph: The indices of the nodes closed under successors
+                or None for the whole graph.
+
+        Returns:
+            The condensed graph position of each node
+            (-1 outside the subgraph),
+            the list of nodes and cycles in topological order,
+            and the CSR offsets and targets of the condensed graph.
+        """
+        if subgraph is None:
+            nodes = self.__nodes
+            offsets, targets = self.__offsets, self.__targets
+        else:
+            nodes = [self.__nodes[i] for i in subgraph]
+            offsets, targets = subgraph_rows(self.__offsets, self.__targets,
+                                             subgraph)
+        component, num_components = strongly_connected_components(
+            offsets, targets)
+        # Topological position of the components.
+        position = array('i', (num_components - 1 - x for x in component))
+        del component
+        member_offsets, members = compressed_rows(
+            num_components, position, array('i', range(len(position))))
+
+        condensed_nodes = []
+        condensed_offsets = array('i', [0])
+        condensed_targets = array('i')
+        for x in range(num_components):
+            x_members = members[member_offsets[x]:member_offsets[x + 1]]
+            x_targets = set()
+            cycle_edges = []
+            for i in x_members:
+                for j in targets[offsets[i]:offsets[i + 1]]:
+                    if position[j] != x:
+                        x_targets.add(position[j])
+                    else:
+                        cycle_edges.append((nodes[i], nodes[j]))
+            condensed_targets.extend(x_targets)
+            condensed_offsets.append(len(condensed_targets))
+            if len(x_members) == 1:
+                condensed_nodes.append(nodes[x_members[0]])
+                continue
+            cycle = Cycle((nodes[i] for i in x_members), cycle_edges)
+            self.cycles.append(cycle)
+            condensed_nodes.append(cycle)
+        self.__index_cycles()
+        if subgraph is not None:
+            local_position = position
+            position = array('i', [-1]) * len(self.__nodes)
+            for i, x in zip(subgraph, local_position):
+                position[i] = x
+        return position, condensed_nodes, condensed_offsets, condensed_targets
+
+    def __index_cycles(self):
+        """Indexes the found cycles in the report order."""
+        self.cycles.sort(key=lambda x: min(str(u) for u in x))
+        self.cycle2index = {}
+        for index, cycle in enumerate(self.cycles):
             self.cycle2index[cycle] = index
+            for node in cycle:
+                self.node2cycle[node] = cycle
 
     # pylint: disable=invalid-name
-    def __decondensation(self):
-        """Reverts the effect of the condensation."""
-        for subgraph, (pre_edges, suc_edges) in self.cycles.items():
-            assert self.digraph.has_node(subgraph)
-            for u, v in pre_edges:
-                if (self.digraph.has_edge(u, subgraph) or
-                    (u in self.node2cycle and
-                     self.digraph.has_edge(self.node2cycle[u], subgraph))):
-                    self.digraph.add_edge(u, v)
-            for u, v in suc_edges:
-                if (self.digraph.has_edge(subgraph, v) or
-                    (v in self.node2cycle and
-                     self.digraph.has_edge(subgraph, self.node2cycle[v]))):
-                    self.digraph.add_edge(u, v)
-            self.digraph.add_nodes_from(subgraph)
-            self.digraph.add_edges_from(subgraph.edges())
-            self.digraph.remove_node(subgraph)
-
-    def analyze(self):
+    def __transitive_reduction(self, position, offsets, targets,
+                               subgraph=None):
+        """Transitive reduction of the condensed graph.
+
+        An edge is redundant
+        if its target is a descendant of another successor.
+        The edges between the original nodes
+        are masked along with their redundant condensed edges.
+
+        Args:
+            position: The condensed graph position of each node.
+            offsets: The CSR offsets of the condensed graph.
+            targets: The CSR targets of the condensed graph.
+            subgraph: The indices of the original nodes
+                whose outgoing edges are masked
+                or None for the whole graph.
+
+        Returns:
+            The CSR offsets and targets of the reduced condensed graph.
+        """
+        num_condensed = len(offsets) - 1
+        redundant_edges = set()  # {source * num_condensed + target}
+        reduced_sources = array('i')
+        reduced_targets = array('i')
+        for i, descendants, _ in descendant_bitsets(offsets, targets):
+            for j in targets[offsets[i]:offsets[i + 1]]:
+                if descendants >> j & 1:
+                    redundant_edges.add(i * num_condensed + j)
+                else:
+                    reduced_sources.append(i)
+                    reduced_targets.append(j)
+        if self.__kept is None:
+            self.__kept = bytearray([1]) * len(self.__targets)
+        if subgraph is None and redundant_edges:
+            subgraph = range(len(self.__nodes))
+        if subgraph is not None:
+            for i in subgraph:
+                x = position[i] * num_condensed
+                for k in range(self.__offsets[i], self.__offsets[i + 1]):
+                    self.__kept[k] = (x + position[self.__targets[k]]
+                                      not in redundant_edges)
+        return compressed_rows(num_condensed, reduced_sources, reduced_targets)
+
+    def __reset(self):
+        """Discards the analysis results."""
+        self.cycles = []
+        self.cycle2index = {}
+        self.node2cycle = {}
+        self.node2cd = {}
+        self.node2level = {}
+        self.__kept = None
+
+    def analyze(self, backend='python'):
         """Applies transitive reduction to the graph and calculates metrics.
 
         If the graph contains cycles,
         the graph is minimized instead.
+
+        Args:
+            backend: The implementation of the graph algorithms in BACKENDS.
         """
-        assert self.digraph.number_of_selfloops() == 0
-        self.__condensation()
-        self.__transitive_reduction()
-        self.__calculate_ccd()
-        self.__calculate_levels()
-        self.__decondensation()
-
-    def __calculate_ccd(self):
-        """Calculates CCD for nodes.
+        assert backend in BACKENDS
+        self.__backend = backend
+        self.__reset()
+        if backend == 'scipy':
+            self.__analyze_sparse()
+        else:
+            self.__analyze_subgraph()
+
+    def __analyze_subgraph(self, subgraph=None):
+        """Analyzes the nodes closed under successors.
 
-        The graph must be minimized with condensed cycles.
+        Args:
+            subgraph: The indices of the nodes or None for the whole graph.
         """
-        descendants = {}  # {node: set(descendant_node)} for memoization.
-
-        def _get_descendants(node):
-            """Returns a set of descendants of a node."""
-            if node not in descendants:
-                node_descendants = set()
-                for v in self.digraph[node]:
-                    node_descendants.add(v)
-                    node_descendants.update(_get_descendants(v))
-                descendants[node] = node_descendants
-            return descendants[node]
-
-        def _get_cd(node):
-            """Returns CD contribution of a node."""
-            if self.__is_external(node):
-                return 0
-            return 1 if node not in self.cycles else node.number_of_nodes()
+        position, nodes, offsets, targets = self.__condensation(subgraph)
+        offsets, targets = self.__transitive_reduction(position, offsets,
+                                                       targets, subgraph)
+        del position
+        self.__calculate_ccd(nodes, offsets, targets)
+        self.__calculate_levels(nodes, offsets, targets)
+
+    def update_edges(self, added_edges=(), removed_edges=(), max_fraction=0.5):
+        """Applies edge changes to the analyzed graph.
 
-        for node in self.digraph:
-            cd = _get_cd(node)
-            for descendant in _get_descendants(node):
-                cd += _get_cd(descendant)
+        The cycles, reduced edges, CD, and levels are recalculated
+        only for the ancestors of the changed nodes and their descendants.
+        The whole graph is analyzed again
+        if the affected nodes exceed the fraction of the graph.
+
+        Args:
+            added_edges: (node, dependency) edges to add.
+                New nodes are added to the graph.
+            removed_edges: (node, dependency) edges in the graph to remove.
+            max_fraction: The fraction of the graph nodes
+                to fall back to the full analysis.
+
+        Returns:
+            The set of nodes with recalculated results.
+        """
+        assert self.__kept is not None, 'The graph is not analyzed.'
+        num_nodes = len(self.__nodes)
+        if self.__predecessors is None:
+            self.__predecessors = compressed_rows(
+                num_nodes, self.__targets,
+                array('i', (i for i in range(num_nodes)
+                            for _ in range(self.__offsets[i],
+                                           self.__offsets[i + 1]))))
+        rows = {}  # {index: {successor index}} of the changed nodes.
+
+        def _row(offsets, targets, changed_rows, i):
+            if i not in changed_rows:
+                changed_rows[i] = (set(targets[offsets[i]:offsets[i + 1]])
+                                   if i < num_nodes else set())
+            return changed_rows[i]
+
+        for u, v in removed_edges:
+            _row(self.__offsets, self.__targets, rows,
+                 self.__index[u]).remove(self.__index[v])
+        for u, v in added_edges:
+            assert u != v and not self.__is_external(u)
+            i = self.__add_node(u)
+            _row(self.__offsets, self.__targets, rows,
+                 i).add(self.__add_node(v))
+        predecessor_rows = {}
+        for i, successors in rows.items():
+            for j in successors.symmetric_difference(
+                    _row(self.__offsets, self.__targets, {}, i)):
+                _row(self.__predecessors[0], self.__predecessors[1],
+                     predecessor_rows, j).symmetric_difference_update((i,))
+
+        new_offsets = [self.__offsets[-1]] * (len(self.__nodes) - num_nodes)
+        self.__offsets.extend(new_offsets)
+        self.__offsets, self.__targets, self.__kept = replace_rows(
+            self.__offsets, self.__targets, rows, self.__kept)
+        offsets, targets = self.__predecessors
+        offsets.extend([offsets[-1]] * len(new_offsets))
+        self.__predecessors = replace_rows(offsets, targets,
+                                           predecessor_rows)[:2]
+
+        ancestors = reachable_nodes(self.__predecessors[0],
+                                    self.__predecessors[1], rows)
+        subgraph = reachable_nodes(self.__offsets, self.__targets, ancestors)
+        if len(subgraph) > max_fraction * len(self.__nodes):
+            self.analyze(self.__backend)
+            return set(self.__nodes)
+        affected_nodes = set(self.__nodes[i] for i in subgraph)
+        for node in affected_nodes:
+            cycle = self.node2cycle.pop(node, node)
+            self.node2cd.pop(cycle, None)
+            self.node2level.pop(cycle, None)
+        self.cycles = [x for x in self.cycles if x.nodes()[0] not in
+                       affected_nodes]
+        self.__analyze_subgraph(subgraph)
+        return affected_nodes
+
+    def __analyze_sparse(self):
+        """Analyzes the graph with the vectorized SciPy backend."""
+        from cppdep import sparse  # pylint: disable=import-outside-toplevel
+        labels, matrix = sparse.condensation(self.__offsets, self.__targets)
+        nodes = [None] * matrix.shape[0]
+        cycle_members = {}  # {label: [node]}
+        label_list = labels.tolist()
+        for node, label in zip(self.__nodes, label_list):
+            if nodes[label] is None:
+                nodes[label] = node
+            else:
+                cycle_members.setdefault(label, [nodes[label]]).append(node)
+        cycle_edges = {label: [] for label in cycle_members}
+        sources, targets = sparse.internal_edges(self.__offsets,
+                                                 self.__targets, labels)
+        for i, j in zip(sources.tolist(), targets.tolist()):
+            cycle_edges[label_list[i]].append((self.__nodes[i],
+                                               self.__nodes[j]))
+        for label, members in cycle_members.items():
+            nodes[label] = Cycle(members, cycle_edges[label])
+            self.cycles.append(nodes[label])
+        self.__index_cycles()
+
+        weights = [
+            len(x) if x in self.cycle2index else int(not self.__is_external(x))
+            for x in nodes
+        ]
+        layers = sparse.layers(matrix)
+        levels = sparse.levels(matrix, weights, layers)
+        cds, redundant = sparse.reachability(matrix, weights, layers)
+        for node, cd, level in zip(nodes, cds.tolist(), levels.tolist()):
             self.node2cd[node] = cd
+            self.node2level[node] = level
+        self.__kept = sparse.kept_edges(self.__offsets, self.__targets,
+                                        labels, matrix, redundant)
+
+    def __calculate_ccd(self, nodes, offsets, targets):
+        """Calculates CCD for nodes.
+
+        The CD contributions of descendants are summed up
+        by counting the set bits of nodes with the same contribution
+        (cycle size, 1, or 0 if external).
 
-    def __calculate_levels(self):
-        """Calculates levels for nodes."""
+        Args:
+            nodes: Nodes and cycles in topological order.
+            offsets: The CSR offsets of the condensed graph.
+            targets: The CSR targets of the condensed graph.
+        """
+        contributions = {}  # {cd: bitset of nodes with the cd contribution}
+        for i, node in enumerate(nodes):
+            if self.__is_external(node):
+                continue
+            cd = len(node) if node in self.cycle2index else 1
+            contributions[cd] = contributions.get(cd, 0) | 1 << i
 
-        def _get_level(node):
-            if node not in self.node2level:
-                level = (not self.__is_external(node)
-                         if node not in self.cycles else node.number_of_nodes())
-                if self.digraph[node]:
-                    level += max(_get_level(x) for x in self.digraph[node])
-                self.node2level[node] = level
-            return self.node2level[node]
+        for i, descendants, children in descendant_bitsets(offsets, targets):
+            reachable = descendants | children | 1 << i
+            self.node2cd[nodes[i]] = sum(
+                cd * popcount(reachable & members)
+                for cd, members in contributions.items())
 
-        for node in self.digraph:
-            _get_level(node)
+    def __calculate_levels(self, nodes, offsets, targets):
+        """Calculates levels for nodes in reverse topological order.
+
+        Args:
+            nodes: Nodes and cycles in topological order.
+            offsets: The CSR offsets of the condensed graph.
+            targets: The CSR targets of the condensed graph.
+        """
+        levels = array('i', [0]) * len(nodes)
+        for i in reversed(range(len(nodes))):
+            node = nodes[i]
+            level = (len(node) if node in self.cycle2index else
+                     not self.__is_external(node))
+            if offsets[i] != offsets[i + 1]:
+                level += max(levels[j]
+                             for j in targets[offsets[i]:offsets[i + 1]])
+            levels[i] = level
+            self.node2level[node] = level
 
     def get_level(self, node):
         """Returns the level of the component node."""
@@ -189,7 +706,7 @@ class Graph(object):
             return
         printer('=' * 80)
         printer('%d cycles detected:\n' % len(self.cycles))
-        for cycle, i in sorted(self.cycle2index.items(), key=lambda x: x[1]):
+        for i, cycle in enumerate(self.cycles):
             printer('cycle #%d (%d nodes):' % (i, cycle.number_of_nodes()),
                     ', '.join(sorted(str(x) for x in cycle.nodes())))
             printer('cycle #%d (%d edges):' % (i, cycle.number_of_edges()),
@@ -213,7 +730,7 @@ class Graph(object):
 
         def _stabilize(node):
             """Returns string for report stabilization sort."""
-            if node in self.cycles:
+            if node in self.cycle2index:
                 return min(str(x) for x in node)
             return str(node)
 
@@ -222,7 +739,7 @@ class Graph(object):
             if reduced_dependencies is None or self.__is_external(node):
                 return
             for v in sorted(
-                    self.digraph[node] if reduced_dependencies else set(
+                    self.successors(node) if reduced_dependencies else set(
                         self.__dep_filter(node.dependencies())),
                     key=lambda x: (self.get_level(x), str(x))):
                 if v in self.node2cycle:
@@ -239,7 +756,7 @@ class Graph(object):
             while level > level_num:
                 level_num += 1
                 printer('level %d:' % level_num)
-            if node in self.cycles:
+            if node in self.cycle2index:
                 cycle_index = self.cycle2index[node]
                 for v in sorted(node, key=str):
                     printer('\t%s <%d>' % (str(v), cycle_index))
@@ -252,11 +769,12 @@ class Graph(object):
         """Calculates and prints overall CCD metrics."""
         ccd = 0
         for node, cd in self.node2cd.items():
-            if node in self.cycles:
+            if node in self.cycle2index:
                 ccd += node.number_of_nodes() * cd
             else:
                 ccd += cd
-        num_nodes = len([x for x in self.digraph if not self.__is_external(x)])
+        num_nodes = len(
+            [x for x in self.__nodes if not self.__is_external(x)])
         average_cd = ccd / num_nodes
         # CCD_Balanced_BTree = (N + 1) * log2(N + 1) - N
         ccd_btree = (num_nodes + 1) * math.log(num_nodes + 1, 2) - num_nodes
@@ -269,10 +787,45 @@ class Graph(object):
         printer('CCD: %d\t ACCD: %.2f\t NCCD: %.2f (typical range is %s)' %
                 (ccd, average_cd, normalized_ccd, typical_range))
 
-    def write_dot(self, file_basename):
+    def write_dot(self, file_basename, cluster_cycles=False,
+                  rank_levels=False):
         """Writes graph into a file in Graphviz DOT format.
 
+        The nodes and edges are streamed into the file
+        in the order of the graph construction.
+
         Args:
             file_basename: The output file name without extension.
+            cluster_cycles: Group the nodes of each cycle into a cluster.
+            rank_levels: Place the nodes of the same level on the same rank.
         """
-        write_dot(self.digraph, file_basename + '.dot')
+        node_ids = [dot_id(x) for x in self.__nodes]
+        with open(file_basename + '.dot', 'w') as dot_file:
+            dot_file.write('strict digraph %s {\n' % dot_id(
+                os.path.basename(file_basename)))
+            clustered = set()
+            if cluster_cycles:
+                for i, cycle in enumerate(self.cycles):
+                    dot_file.write('\tsubgraph "cluster_%d" {\n' % i)
+                    dot_file.write('\t\tlabel="cycle #%d";\n' % i)
+                    for node in cycle:
+                        dot_file.write('\t\t%s;\n' %
+                                       node_ids[self.__index[node]])
+                        clustered.add(node)
+                    dot_file.write('\t}\n')
+            for node, node_id in zip(self.__nodes, node_ids):
+                if node not in clustered:
+                    dot_file.write('\t%s;\n' % node_id)
+            if rank_levels and self.node2level:
+                ranks = {}  # {level: [node_id]}
+                for node, node_id in zip(self.__nodes, node_ids):
+                    if node not in clustered:
+                        ranks.setdefault(self.get_level(node),
+                                         []).append(node_id)
+                for level in sorted(ranks):
+                    dot_file.write('\t{rank=same; %s;}\n' %
+                                   '; '.join(ranks[level]))
+            for i, source_id in enumerate(node_ids):
+                for j in self.__successor_indices(i):
+                    dot_file.write('\t%s -> %s;\n' % (source_id, node_ids[j]))
+            dot_file.write('}\n')
@@ -0,0 +1,162 @@
+# Copyright (C) 2017 Olzhas Rakhimov
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Wall and CPU times of the analysis phases with event counters.
+
+The phases are recorded in the order of their first occurrence,
+and repeated phases are accumulated.
+"""
+
+from __future__ import absolute_import, division
+
+import collections
+import json
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows.
+    resource = None  # pylint: disable=invalid-name
+
+# pylint: disable=invalid-name
+_wall_time = getattr(time, 'perf_counter', time.time)
+_cpu_time = getattr(time, 'process_time', None) or time.clock
+
+
+def peak_memory(who='self'):
+    """Returns the peak resident memory in bytes or None if unknown.
+
+    Args:
+        who: 'self' for this process or 'children' for the largest child.
+    """
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == 'self' else
+                               resource.RUSAGE_CHILDREN)
+    if sys.platform == 'darwin':
+        return usage.ru_maxrss
+    return usage.ru_maxrss * 1024  # Kilobytes on Linux and BSD.
+
+
+class _Phase(object):
+    """Context manager recording the times of a phase."""
+
+    __slots__ = ['__profile', '__name', '__start']
+
+    def __init__(self, profile, name):
+        """Initializes the phase of the profile."""
+        self.__profile = profile
+        self.__name = name
+        self.__start = None
+
+    def __enter__(self):
+        """Starts the timers."""
+        self.__start = (_wall_time(), _cpu_time())
+        return self
+
+    def __exit__(self, *_):
+        """Records the elapsed times."""
+        self.__profile.add(self.__name, _wall_time() - self.__start[0],
+                           _cpu_time() - self.__start[1])
+
+
+class _NoPhase(object):
+    """Context manager that does not record anything."""
+
+    __slots__ = []
+
+    def __enter__(self):
+        """Does nothing."""
+        return self
+
+    def __exit__(self, *_):
+        """Does nothing."""
+
+
+_NO_PHASE = _NoPhase()
+
+
+class Profile(object):
+    """Wall and CPU times of phases and counters of events.
+
+    Attributes:
+        phases: {phase: [wall seconds, CPU seconds, number of occurrences]}
+        counters: {event: count}
+    """
+
+    def __init__(self):
+        """Starts the profile of the process."""
+        self.phases = collections.OrderedDict()
+        self.counters = collections.Counter()
+        self.__start = (_wall_time(), _cpu_time())
+
+    def phase(self, name):
+        """Returns the context manager to time a phase with the name."""
+        return _Phase(self, name)
+
+    def add(self, name, wall_time, cpu_time, num_occurrences=1):
+        """Accumulates the times of a phase."""
+        times = self.phases.setdefault(name, [0.0, 0.0, 0])
+        times[0] += wall_time
+        times[1] += cpu_time
+        times[2] += num_occurrences
+
+    def merge(self, phases, prefix=''):
+        """Accumulates the phases of another profile.
+
+        Args:
+            phases: The phases of the other profile.
+            prefix: The prefix to the names of the phases.
+        """
+        for name, times in phases.items():
+            self.add(prefix + name, *times)
+
+    def count(self, event, value=1):
+        """Increments the counter of the event."""
+        self.counters[event] += value
+
+    def to_dict(self):
+        """Returns the profile as a JSON-serializable dictionary."""
+        return {
+            'wall_time': _wall_time() - self.__start[0],
+            'cpu_time': _cpu_time() - self.__start[1],
+            'phases': [{
+                'name': name,
+                'wall_time': times[0],
+                'cpu_time': times[1],
+                'count': times[2]
+            } for name, times in self.phases.items()],
+            'counters': dict(self.counters),
+            'peak_memory': peak_memory(),
+            'peak_memory_children': peak_memory('children'),
+        }
+
+    def write(self, file_path):
+        """Writes the profile into a file in JSON format."""
+        with open(file_path, 'w') as json_file:
+            json.dump(self.to_dict(), json_file, indent=2, sort_keys=True)
+            json_file.write('\n')
+
+
+def phase(profile, name):
+    """Returns the context manager to time a phase of an optional profile.
+
+    Args:
+        profile: The Profile or None to skip the timing.
+        name: The name of the phase.
+    """
+    if profile is None:
+        return _NO_PHASE
+    return profile.phase(name)
@@ -0,0 +1,141 @@
+# Copyright (C) 2017 Olzhas Rakhimov
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Validation of loaded configuration documents against the schema.
+
+Only the subset of the Kwalify schema language
+used by the configuration schema is supported:
+implicit 'map' and 'seq' rules, 'required' keys, and 'str' scalars.
+Like Kwalify, keys absent from a map rule are errors,
+and null values are accepted unless required.
+"""
+
+from __future__ import absolute_import
+
+import hashlib
+import os.path
+
+SCHEMA_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'config_schema.yml')
+
+_TYPES = {'str': (str, type(u''))}  # {type: Python types}
+_RULE_KEYS = frozenset(['required', 'type', 'map', 'seq'])
+
+_schemas = {}  # {schema_path: schema} pylint: disable=invalid-name
+
+
+class SchemaError(Exception):
+    """The document does not conform to the schema."""
+
+    pass
+
+
+def load_schema(schema_path=SCHEMA_FILE):
+    """Loads and checks the schema once per process.
+
+    Args:
+        schema_path: The path to the YAML schema file.
+
+    Returns:
+        The root rule of the schema.
+
+    Raises:
+        YAMLError: The schema is malformed.
+        ValueError: The schema uses unsupported rules.
+    """
+    schema = _schemas.get(schema_path)
+    if schema is None:
+        from yaml import safe_load  # pylint: disable=import-outside-toplevel
+        with open(schema_path) as schema_file:
+            schema = safe_load(schema_file)
+        _check_rule(schema)
+        _schemas[schema_path] = schema
+    return schema
+
+
+def _check_rule(rule):
+    """Raises ValueError upon rules unsupported by the validator."""
+    if not isinstance(rule, dict) or not _RULE_KEYS.issuperset(rule):
+        raise ValueError('Unsupported schema rule: %r' % rule)
+    if 'map' in rule:
+        for sub_rule in rule['map'].values():
+            _check_rule(sub_rule)
+    elif 'seq' in rule:
+        if len(rule['seq']) != 1:
+            raise ValueError('Unsupported sequence rule: %r' % rule)
+        _check_rule(rule['seq'][0])
+    elif rule.get('type') not in _TYPES:
+        raise ValueError('Unsupported type rule: %r' % rule)
+
+
+def validate(document, schema):
+    """Validates the loaded document against the schema.
+
+    Args:
+        document: The document loaded from YAML.
+        schema: The root rule from load_schema.
+
+    Raises:
+        SchemaError: The list of violations with their document paths.
+    """
+    errors = []
+    _validate(document, schema, '', errors)
+    if errors:
+        raise SchemaError('\n'.join(errors))
+
+
+def _validate(value, rule, path, errors):
+    """Appends the violations of the rule by the value to errors."""
+    if value is None:  # Only null maps can violate their required keys.
+        if 'map' in rule:
+            _validate({}, rule, path, errors)
+    elif 'map' in rule:
+        if not isinstance(value, dict):
+            errors.append("Path '%s': the value is not a map." % (path or '/'))
+            return
+        for key, sub_rule in rule['map'].items():
+            if sub_rule.get('required') and value.get(key) is None:
+                errors.append("Path '%s': cannot find required key '%s'." %
+                              (path or '/', key))
+        for key, item in value.items():
+            sub_rule = rule['map'].get(key)
+            if sub_rule is None:
+                errors.append("Path '%s': key '%s' is not defined." %
+                              (path or '/', key))
+            else:
+                _validate(item, sub_rule, '%s/%s' % (path, key), errors)
+    elif 'seq' in rule:
+        if not isinstance(value, list):
+            errors.append("Path '%s': the value is not a sequence." % path)
+            return
+        for i, item in enumerate(value):
+            _validate(item, rule['seq'][0], '%s/%d' % (path, i), errors)
+    elif not isinstance(value, _TYPES[rule['type']]):
+        errors.append("Path '%s': value '%s' is not of type '%s'." %
+                      (path, value, rule['type']))
+
+
+def digest(content, schema_path=SCHEMA_FILE):
+    """Returns the hex digest identifying the document for the schema.
+
+    Args:
+        content: The raw bytes of the document.
+        schema_path: The path to the schema file.
+    """
+    sha1 = hashlib.sha1()
+    with open(schema_path, 'rb') as schema_file:
+        sha1.update(schema_file.read())
+    sha1.update(b'\0')
+    sha1.update(content)
+    return sha1.hexdigest()
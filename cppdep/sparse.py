@@ -0,0 +1,222 @@
+# Copyright (C) 2017 Olzhas Rakhimov
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Vectorized graph algorithms over SciPy sparse adjacency matrices.
+
+This optional backend requires NumPy and SciPy.
+The condensed acyclic graph is processed in layers peeled from the sinks,
+so the number of vectorized steps is proportional to the graph depth.
+The reachability of nodes is kept in bit-packed blocks of columns
+to bound the memory.
+"""
+
+from __future__ import absolute_import, division
+
+import numpy as np
+from scipy.sparse import csgraph, csr_matrix
+
+_BLOCK_BYTES = 1 << 26  # The memory budget for reachability bits.
+
+
+def condensation(offsets, targets):
+    """Condenses strongly connected components into single nodes.
+
+    Args:
+        offsets: The CSR offsets of the graph adjacency in array('i').
+        targets: The CSR targets of the graph adjacency in array('i').
+
+    Returns:
+        The component label of each node
+        and the adjacency matrix of the components without duplicate edges.
+    """
+    offsets = np.frombuffer(offsets, dtype=np.intc)
+    targets = np.frombuffer(targets, dtype=np.intc)
+    num_nodes = len(offsets) - 1
+    adjacency = csr_matrix(
+        (np.ones(len(targets), dtype=np.int8), targets, offsets),
+        shape=(num_nodes, num_nodes))
+    num_components, labels = csgraph.connected_components(
+        adjacency, directed=True, connection='strong')
+    sources = sources_of(offsets)
+    external = labels[sources] != labels[targets]
+    condensed = csr_matrix(
+        (np.ones(np.count_nonzero(external), dtype=np.int8),
+         (labels[sources[external]], labels[targets[external]])),
+        shape=(num_components, num_components))
+    condensed.sum_duplicates()
+    condensed.data[:] = 1
+    return labels, condensed
+
+
+def sources_of(offsets):
+    """Returns the source node index of each edge in the CSR adjacency."""
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+def internal_edges(offsets, targets, labels):
+    """Finds the edges within components.
+
+    Args:
+        offsets: The CSR offsets of the graph adjacency in array('i').
+        targets: The CSR targets of the graph adjacency in array('i').
+        labels: The component label of each node.
+
+    Returns:
+        The source and target node indices of the edges.
+    """
+    offsets = np.frombuffer(offsets, dtype=np.intc)
+    targets = np.frombuffer(targets, dtype=np.intc)
+    sources = sources_of(offsets)
+    internal = labels[sources] == labels[targets]
+    return sources[internal], targets[internal]
+
+
+def kept_edges(offsets, targets, labels, matrix, redundant):
+    """Masks the edges between the nodes of redundant condensed edges.
+
+    Args:
+        offsets: The CSR offsets of the graph adjacency in array('i').
+        targets: The CSR targets of the graph adjacency in array('i').
+        labels: The component label of each node.
+        matrix: The adjacency matrix of the components.
+        redundant: The mask of the redundant component edges
+            in the order of matrix.indices.
+
+    Returns:
+        The bytearray mask of the remaining edges aligned with the targets.
+    """
+    offsets = np.frombuffer(offsets, dtype=np.intc)
+    targets = np.frombuffer(targets, dtype=np.intc)
+    sources = sources_of(offsets)
+    num_components = matrix.shape[0]
+    keys = (sources_of(matrix.indptr).astype(np.int64) * num_components +
+            matrix.indices)
+    source_labels = labels[sources]
+    target_labels = labels[targets]
+    positions = np.searchsorted(
+        keys,
+        source_labels.astype(np.int64) * num_components + target_labels)
+    np.minimum(positions, len(keys) - 1, out=positions)
+    keep = source_labels == target_labels  # Edges within cycles.
+    if len(keys):
+        keep |= ~redundant[positions]
+    return bytearray(keep.astype(np.uint8).tobytes())
+
+
+def _gather(matrix, rows):
+    """Returns the positions of the row entries and the row boundaries."""
+    starts = matrix.indptr[rows]
+    counts = matrix.indptr[rows + 1] - starts
+    bounds = np.concatenate(([0], np.cumsum(counts)))
+    positions = np.arange(bounds[-1]) + np.repeat(starts - bounds[:-1], counts)
+    return positions, bounds
+
+
+def layers(matrix):
+    """Peels an acyclic graph from the sinks.
+
+    Args:
+        matrix: The adjacency matrix of the graph.
+
+    Returns:
+        The list of node index arrays
+        with all the successors of the nodes in the preceding layers.
+    """
+    predecessors = matrix.T.tocsr()
+    num_pending_successors = np.diff(matrix.indptr)
+    frontier = np.flatnonzero(num_pending_successors == 0)
+    result = []
+    while frontier.size:
+        result.append(frontier)
+        positions, _ = _gather(predecessors, frontier)
+        nodes, counts = np.unique(predecessors.indices[positions],
+                                  return_counts=True)
+        num_pending_successors[nodes] -= counts
+        frontier = nodes[num_pending_successors[nodes] == 0]
+    return result
+
+
+def levels(matrix, weights, graph_layers):
+    """Calculates the levels of nodes in an acyclic graph.
+
+    Args:
+        matrix: The adjacency matrix of the graph.
+        weights: The contribution of each node to its level.
+        graph_layers: The layers of the graph peeled from the sinks.
+
+    Returns:
+        The array of node levels.
+    """
+    result = np.array(weights, dtype=np.int64)
+    for frontier in graph_layers:
+        positions, bounds = _gather(matrix, frontier)
+        if not positions.size:
+            continue
+        nonempty = bounds[1:] != bounds[:-1]
+        result[frontier[nonempty]] += np.maximum.reduceat(
+            result[matrix.indices[positions]], bounds[:-1][nonempty])
+    return result
+
+
+def reachability(matrix, weights, graph_layers):
+    """Calculates the weighted reachability of nodes in an acyclic graph.
+
+    The nodes reachable from the successors of a node
+    are accumulated as packed bits for blocks of columns at a time.
+
+    Args:
+        matrix: The adjacency matrix of the graph.
+        weights: The weight of each node.
+        graph_layers: The layers of the graph peeled from the sinks.
+
+    Returns:
+        The array of the total weights of the nodes reachable from each node
+        including itself,
+        and the mask of the redundant edges in the order of matrix.indices.
+    """
+    num_nodes = matrix.shape[0]
+    weights = np.asarray(weights, dtype=np.int64)
+    totals = weights.copy()
+    redundant = np.zeros(len(matrix.indices), dtype=bool)
+    num_bytes = -(-num_nodes // 8)  # All the columns at once if affordable.
+    num_bytes = max(8, min(num_bytes, _BLOCK_BYTES // max(num_nodes, 1)))
+    width = num_bytes * 8
+    for first in range(0, num_nodes, width):
+        last = min(first + width, num_nodes)
+        bits = np.zeros((num_nodes, num_bytes), dtype=np.uint8)
+        for frontier in graph_layers:
+            positions, bounds = _gather(matrix, frontier)
+            if not positions.size:
+                continue
+            nonempty = bounds[1:] != bounds[:-1]
+            children = matrix.indices[positions]
+            sources = np.repeat(frontier, bounds[1:] - bounds[:-1])
+            descendants = np.bitwise_or.reduceat(
+                bits[children], bounds[:-1][nonempty], axis=0)
+            in_block = (children >= first) & (children < last)
+            column = children[in_block] - first
+            mask = (0x80 >> (column & 7)).astype(np.uint8)
+            local = np.repeat(np.arange(np.count_nonzero(nonempty)),
+                              (bounds[1:] - bounds[:-1])[nonempty])
+            redundant[positions[in_block]] = (
+                descendants[local[in_block], column >> 3] & mask) != 0
+            bits[frontier[nonempty]] = descendants
+            np.bitwise_or.at(bits, (sources[in_block], column >> 3), mask)
+        block_weights = weights[first:last]
+        num_rows = max(1, _BLOCK_BYTES // width)
+        for row in range(0, num_nodes, num_rows):
+            totals[row:row + num_rows] += np.unpackbits(
+                bits[row:row + num_rows], axis=1)[:, :last - first].dot(
+                    block_weights)
+    return totals, redundant
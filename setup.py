@@ -20,11 +20,9 @@ setup(
     license="GPLv3+",
     install_requires=[
         "networkx",
-        "pydot",
-        "pydotplus",
-        "PyYAML",
-        "PyKwalify>=1.6.0"
+        "PyYAML"
     ],
+    extras_require={"scipy": ["numpy", "scipy"]},
     keywords=["c++", "c", "static analysis", "dependency analysis"],
     url="http://github.com/rakhimov/cppdep",
     packages=["cppdep"],
@@ -0,0 +1,166 @@
+# Copyright (C) 2017 Olzhas Rakhimov
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for the persistent include and validation caches."""
+
+from __future__ import absolute_import
+
+import argparse
+import os
+
+import pytest
+
+from cppdep.__main__ import get_include_cache
+from cppdep.cache import IncludeCache, ValidationCache
+from cppdep.cppdep import Include, ScanInfo
+
+#pylint: disable=redefined-outer-name
+
+
+@pytest.fixture()
+def src_file(tmpdir):
+    """A source file with include directives."""
+    src = tmpdir.join('source.cc')
+    src.write('#include "source.h"\n#include <vector>\n')
+    return str(src)
+
+
+def scan(file_path):
+    """Returns the string representation of the file includes."""
+    return [str(x) for x in Include.grep(file_path)]
+
+
+def test_cache_hit(src_file, tmpdir):
+    """Unchanged files are served from the cache."""
+    cache = IncludeCache(str(tmpdir.join('cache')))
+    assert cache.get(src_file) is None
+    cache.put(src_file, Include.grep(src_file))
+    includes = cache.get(src_file)
+    assert [str(x) for x in includes] == ['"source.h"', '<vector>']
+    assert all(x.hpath is None for x in includes)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_modified(src_file, tmpdir):
+    """Modified files invalidate their entries."""
+    cache = IncludeCache(str(tmpdir.join('cache')))
+    cache.get(src_file)
+    cache.put(src_file, Include.grep(src_file))
+    with open(src_file, 'a') as src:
+        src.write('#include <map>\n')
+    assert cache.get(src_file) is None
+
+
+@pytest.mark.parametrize('use_hash', [True, False])
+def test_cache_touched(use_hash, src_file, tmpdir):
+    """Touched files are rescued with the content hash."""
+    cache = IncludeCache(str(tmpdir.join('cache')), use_hash=use_hash)
+    cache.get(src_file)
+    cache.put(src_file, Include.grep(src_file))
+    stat = os.stat(src_file)
+    os.utime(src_file, (stat.st_atime, stat.st_mtime + 10))
+    assert (cache.get(src_file) is not None) == use_hash
+
+
+def test_cache_persistence(src_file, tmpdir):
+    """The cache survives between runs."""
+    cache_dir = str(tmpdir.join('cache'))
+    cache = IncludeCache(cache_dir)
+    cache.get(src_file)
+    cache.put(src_file, Include.grep(src_file))
+    cache.save()
+    cache = IncludeCache(cache_dir)
+    assert len(cache) == 1
+    assert [str(x) for x in cache.get(src_file)] == scan(src_file)
+    cache.invalidate()
+    cache.save()
+    assert not IncludeCache(cache_dir)
+
+
+def test_cache_info(src_file, tmpdir):
+    """The scan information is kept along with the include directives."""
+    cache_dir = str(tmpdir.join('cache'))
+    cache = IncludeCache(cache_dir)
+    assert cache.lookup(src_file) is None
+    cache.put(src_file, Include.grep(src_file), ScanInfo(truncated_at=1))
+    cache.save()
+    includes, info = IncludeCache(cache_dir).lookup(src_file)
+    assert [str(x) for x in includes] == scan(src_file)
+    assert info.truncated_at == 1
+
+
+def test_cache_eviction(tmpdir):
+    """The least recently used entries are evicted first."""
+    cache_dir = str(tmpdir.join('cache'))
+    cache = IncludeCache(cache_dir, max_entries=2)
+    files = []
+    for name in ('a.h', 'b.h', 'c.h'):
+        src = tmpdir.join(name)
+        src.write('#include <%s>\n' % name)
+        files.append(str(src))
+        cache.get(files[-1])
+        cache.put(files[-1], Include.grep(files[-1]))
+    assert cache.get(files[0]) is not None
+    cache.save()
+    cache = IncludeCache(cache_dir, max_entries=2)
+    assert cache.get(files[1]) is None
+    assert cache.get(files[0]) is not None
+    assert cache.get(files[2]) is not None
+    cache.invalidate([files[0]])
+    assert cache.get(files[0]) is None
+
+
+def test_cache_corrupt(tmpdir):
+    """Broken cache files are discarded."""
+    tmpdir.join(IncludeCache.FILENAME).write('garbage')
+    assert not IncludeCache(str(tmpdir))
+
+
+@pytest.mark.parametrize('preamble,max_lines,filename', [
+    (False, None, IncludeCache.FILENAME), (False, 0, IncludeCache.FILENAME),
+    (True, None, 'preamble.' + IncludeCache.FILENAME),
+    (True, 0, 'preamble0.' + IncludeCache.FILENAME),
+    (True, 10, 'preamble10.' + IncludeCache.FILENAME)
+])
+def test_include_cache_tag(preamble, max_lines, filename, tmpdir):
+    """The scanning modes with different results have separate caches."""
+    args = argparse.Namespace(cache_dir=str(tmpdir), cache_size=10,
+                              cache_hash=False, clear_cache=False,
+                              preamble=preamble, max_preamble_lines=max_lines)
+    cache = get_include_cache(args)
+    assert os.path.basename(cache.path) == filename
+
+
+def test_validation_cache(tmpdir):
+    """Validated digests persist with the least recently used eviction."""
+    cache_dir = str(tmpdir.join('cache'))
+    cache = ValidationCache(cache_dir, max_entries=2)
+    assert 'a' not in cache
+    for digest in 'abc':
+        cache.add(digest)
+    assert 'a' in cache
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.save()
+    cache = ValidationCache(cache_dir)
+    assert len(cache) == 2
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
+    cache.invalidate()
+    assert 'a' not in cache
+
+
+def test_validation_cache_corrupt(tmpdir):
+    """Broken validation cache files are discarded."""
+    tmpdir.join(ValidationCache.FILENAME).write('garbage')
+    assert not ValidationCache(str(tmpdir))
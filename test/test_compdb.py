@@ -0,0 +1,92 @@
+# Copyright (C) 2017 Olzhas Rakhimov
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for the streaming reader of compilation databases."""
+
+from __future__ import absolute_import
+
+import json
+
+import pytest
+
+from cppdep import compdb
+
+_COMMANDS = [
+    {'directory': '/build', 'file': '../src/a.cc', 'command': 'c++ -c a.cc'},
+    {'directory': '/build', 'file': 'b.cc', 'arguments': ['c++', 'b.cc']},
+    {'directory': '/build', 'file': u'ç.cc', 'command': 'c++ "[]{},"'},
+]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 1 << 20])
+@pytest.mark.parametrize('indent', [None, 4])
+def test_read_commands(chunk_size, indent, tmpdir):
+    """Command objects are decoded across chunk boundaries."""
+    json_file = tmpdir.join('compile_commands.json')
+    json_file.write_text(json.dumps(_COMMANDS, indent=indent) + '\n',
+                         encoding='utf-8')
+    assert list(compdb.read_commands(str(json_file), chunk_size)) == _COMMANDS
+
+
+@pytest.mark.parametrize('text', ['[]', ' [ \n ] ', '[\n]\n'])
+def test_read_commands_empty(text, tmpdir):
+    """Empty databases have no commands."""
+    json_file = tmpdir.join('compile_commands.json')
+    json_file.write(text)
+    assert not list(compdb.read_commands(str(json_file), 1))
+
+
+@pytest.mark.parametrize('text', [
+    '', '{}', '[{}', '[{} {}]', '[{},]', '[1]', '[{"file": "a.cc"', '[,{}]'
+])
+def test_read_commands_malformed(text, tmpdir):
+    """Malformed databases are reported."""
+    json_file = tmpdir.join('compile_commands.json')
+    json_file.write(text)
+    with pytest.raises(ValueError):
+        list(compdb.read_commands(str(json_file), 2))
+
+
+@pytest.mark.parametrize('command,expected', [
+    (_COMMANDS[0], '/src/a.cc'),
+    (_COMMANDS[1], '/build/b.cc'),
+    ({'directory': '/build', 'file': '/src/c.cc'}, '/src/c.cc'),
+])
+def test_source_path(command, expected):
+    """Compiled files are absolute with respect to the command directory."""
+    assert compdb.source_path(command) == expected
+
+
+def test_source_path_missing():
+    """Commands must have the compiled file and directory."""
+    with pytest.raises(ValueError):
+        compdb.source_path({'file': 'a.cc'})
+
+
+@pytest.mark.parametrize('command,expected', [
+    ('c++ -c a.cc', []),
+    ('c++ -Iinc -I inc2 -I/abs -c a.cc', ['/b/inc', '/b/inc2', '/abs']),
+    ('c++ -isystem sys -isystem/usr/include -iquote q -idirafter ../d',
+     ['/b/sys', '/usr/include', '/b/q', '/d']),
+    ('c++ -I"with space" -I \'quoted\' -DX=\\"1\\"',
+     ['/b/with space', '/b/quoted']),
+    ('c++ -include config.h -isysroot /sdk -Iinc', ['/b/inc']),
+    ('c++ -I', []),
+    (['c++', '-I', 'with space', '-Iinc'], ['/b/with space', '/b/inc']),
+])
+def test_include_dirs(command, expected):
+    """Include directories are extracted from commands and arguments."""
+    key = 'arguments' if isinstance(command, list) else 'command'
+    assert compdb.include_dirs({'directory': '/b', key: command}) == expected
@@ -17,15 +17,27 @@
 
 from __future__ import absolute_import
 
+import argparse
+import collections
+import fnmatch
+import itertools
+import json
 import os
 import platform
+import random
 import re
+import subprocess
+import sys
 
 import mock
 import pytest
 
 from cppdep import cppdep
+from cppdep import schema
+from cppdep.cache import IncludeCache, ValidationCache
 from cppdep.cppdep import Include
+from cppdep.graph import BACKENDS
+from cppdep.profiling import Profile
 
 
 def path_relpath_posix(path, root):
@@ -95,6 +107,17 @@ def test_path_isancestor(parent, child, expected):
     assert cppdep.path_isancestor(parent, child) == expected
 
 
+@pytest.mark.skipif(platform.system() == 'Windows',
+                    reason='The same logic with different path separators.')
+@pytest.mark.parametrize('path,expected',
+                         [('/dir/file', ['/dir/file', '/dir', '/']),
+                          ('/dir', ['/dir', '/']), ('/', ['/'])])
+def test_path_ancestors(path, expected):
+    """Test the order of ancestor directories."""
+    assert list(cppdep.path_ancestors(path)) == expected
+    assert all(cppdep.path_isancestor(x, path) for x in expected)
+
+
 @pytest.mark.skipif(platform.system() != 'Windows', reason='POSIX is noop.')
 @pytest.mark.parametrize('path,expected',
                          [('file', 'file'), ('/dir/file', '/dir/file'),
@@ -105,6 +128,56 @@ def test_path_to_posix_sep(path, expected):
     assert cppdep.path_to_posix_sep(path) == expected
 
 
+@pytest.mark.parametrize('patterns', [[], ['*/build'], ['/a/*.cc', '/a/b'],
+                                      ['/a/[bc]?/*', '/a/[!b]*'],
+                                      ['/a/b/build*']])
+@pytest.mark.parametrize('path', ['/a', '/a/b', '/a/b/build', '/a/b/x.cc',
+                                  '/a/cd/x.h', '/a/b/build/x.cc', '/a/x.cc'])
+def test_glob_matcher(patterns, path):
+    """The compiled patterns agree with fnmatch."""
+    assert (cppdep.glob_matcher(patterns)(path) ==
+            any(fnmatch.fnmatch(path, x) for x in patterns))
+
+
+@pytest.fixture()
+def src_tree(tmpdir):
+    """A source directory tree with a symbolic link to a directory."""
+    for path in ('a/x.h', 'a/b/y.h', 'a/b/c/z.h', 'a/d/w.h', 'e/v.h'):
+        tmpdir.join(path).write('', ensure=True)
+    if hasattr(os, 'symlink'):
+        tmpdir.join('a/link').mksymlinkto(tmpdir.join('e'))
+    return tmpdir
+
+
+@pytest.mark.parametrize('use_scandir', [True, False])
+def test_walk_files(use_scandir, src_tree, monkeypatch):
+    """The walk is os.walk without symbolic links and ignored directories."""
+    if not use_scandir:
+        monkeypatch.setattr(cppdep, 'scandir', None)
+    root = str(src_tree.join('a'))
+
+    def _walk(is_ignored):
+        return [(x, sorted(y))
+                for x, y in cppdep.walk_files(root, is_ignored)]
+
+    assert _walk(lambda _: False) == [(x, sorted(z))
+                                      for x, _, z in os.walk(root)]
+    assert [x for x, _ in _walk(lambda x: x.endswith('b'))] == [
+        x for x, _, _ in os.walk(root)
+        if 'b' not in os.path.relpath(x, root).split(os.path.sep)
+    ]
+    assert not _walk(lambda x: x == root)
+
+
+def test_find_source_files_ignore(src_tree):
+    """Ignored directories are pruned with their subdirectories."""
+    dir_paths = set()
+    hpaths, _ = cppdep.Package.find_source_files(
+        [str(src_tree.join('a'))], [str(src_tree.join('a', 'b'))], dir_paths)
+    assert sorted(hpaths) == ['w', 'x']
+    assert dir_paths == set(str(src_tree.join(x)) for x in ('a', 'a/d'))
+
+
 @pytest.mark.parametrize('dictionary,element,default_value,expected',
                          [({'tag': 'value'}, 'tag', 'default', 'value'),
                           ({}, 'tag', 'default', 'default'),
@@ -209,11 +282,99 @@ def test_include_neq(include_one, include_two):
      pytest.mark.xfail(('#if 0\n#include <vector>\n#endif', [])),
      pytest.mark.xfail(('/*\n#include <vector>\n*/', [])),
      pytest.mark.xfail(('#define V  <vector>\n#include V\n', ['<vector>']))])
-def test_include_grep(text, expected, tmpdir):
+@pytest.mark.parametrize('scanner', ['text', 'bytes'])
+def test_include_grep(text, expected, scanner, tmpdir):
     """Tests the include directive search from a text."""
     src = tmpdir.join('include_grep')
     src.write(text)
-    assert [str(x) for x in Include.grep(str(src))] == expected
+    grep = cppdep.SCANNERS[scanner]
+    assert [str(x) for x in grep(str(src))] == expected
+
+
+@pytest.mark.parametrize('text', [
+    b'#include <a>\r\n#include "b"\r\n', b'#include <a>\r#include "b"\r',
+    b'x\r  #include <a>\n\n#include "b"', b'#include <a> #include <b>\n',
+    b'#\x0binclude\x1c<a>\x0c\n#include <\x1fb>\n#include "\xff\xfe"',
+    b'#include <a>\n' * 10 + b'// #include <b>\n' * 70000
+])
+def test_include_grep_bytes(text, tmpdir):
+    """The bytes scanner finds the same directives as the text scanner."""
+    src = tmpdir.join('include_grep')
+    src.write_binary(text)
+    includes = list(Include.grep_bytes(str(src)))
+    assert [str(x) for x in includes] == [
+        str(x) for x in Include.grep(str(src))
+    ]
+
+
+@pytest.mark.parametrize(
+    'text,expected',
+    [('#include <a>\nint x;\n#include <b>', ['<a>']),
+     ('\n  \n#include <a>\n\n#include <b>\n', ['<a>', '<b>']),
+     ('// a\n#include <a>\n/* b */\n#include <b>', ['<a>', '<b>']),
+     ('/*\nint x;\n*/\n#include <a>\n', ['<a>']),
+     ('/* a */ #include <a>\n', []),
+     ('/* a */ int x;\n#include <a>\n', []),
+     ('#ifndef A\n#define A \\\n  int\n#include <a>\n', ['<a>']),
+     ('#include <a> /* b\nint x;\n*/\n#include <b>', ['<a>', '<b>']),
+     ('#include <a> // b\nint x;\n#include <b>', ['<a>']),
+     ('namespace {\n#include <a>\n}', [])])
+@pytest.mark.parametrize('scanner', ['text', 'bytes'])
+def test_include_grep_preamble(text, expected, scanner, tmpdir):
+    """Tests the include directive search in the preamble of a text."""
+    src = tmpdir.join('include_grep')
+    src.write(text)
+    grep = cppdep.SCANNERS[scanner]
+    assert [str(x) for x in grep(str(src), preamble=True)] == expected
+
+
+@pytest.mark.parametrize('max_lines,expected', [(None, ['<a>', '<b>']),
+                                                (3, ['<a>', '<b>']),
+                                                (2, ['<a>']), (0, [])])
+@pytest.mark.parametrize('scanner', ['text', 'bytes'])
+def test_include_grep_preamble_max_lines(max_lines, expected, scanner, tmpdir,
+                                         monkeypatch):
+    """The preamble truncation by the number of lines is diagnosed."""
+    mock_warn = mock.MagicMock(spec=cppdep.warn)
+    monkeypatch.setattr(cppdep, 'warn', mock_warn)
+    src = tmpdir.join('include_grep')
+    src.write('#include <a>\n\n#include <b>\n')
+    grep = cppdep.SCANNERS[scanner]
+    assert ([str(x) for x in grep(str(src), True, max_lines)] == expected)
+    assert mock_warn.called == (max_lines is not None and max_lines < 3)
+
+
+@pytest.mark.parametrize('text,truncated', [
+    ('#include <a>\n#include <b>\nint x;\n', False),
+    ('#include <a>\n#include <b>\n', False),
+    ('#include <a>\n#include <b>\n\nint x;\n', True),
+    ('#include <a>\n#include <b> /*\nint x;\n*/', True),
+    ('#include <a>\n#define B \\\nint x;\n', True),
+])
+@pytest.mark.parametrize('scanner', ['text', 'bytes'])
+def test_include_grep_preamble_max_lines_end(text, truncated, scanner, tmpdir,
+                                             monkeypatch):
+    """The preamble of the maximum number of lines is not truncated."""
+    mock_warn = mock.MagicMock(spec=cppdep.warn)
+    monkeypatch.setattr(cppdep, 'warn', mock_warn)
+    src = tmpdir.join('include_grep')
+    src.write(text)
+    grep = cppdep.SCANNERS[scanner]
+    assert [str(x) for x in grep(str(src), True, 2)][:1] == ['<a>']
+    assert mock_warn.called == truncated
+
+
+@pytest.mark.parametrize('preamble', [False, True])
+@pytest.mark.parametrize('scanner', ['text', 'bytes'])
+def test_include_grep_bytes_read(preamble, scanner, tmpdir):
+    """Scanners report the bytes read instead of the file size."""
+    src = tmpdir.join('include_grep')
+    src.write('#include <a>\nint x;\n' + '// #include <b>\n' * (1 << 16))
+    scan = cppdep.ScanInfo()
+    grep = cppdep.SCANNERS[scanner]
+    assert [str(x) for x in grep(str(src), preamble, scan=scan)] == ['<a>']
+    assert scan.bytes_read > 0
+    assert (scan.bytes_read < src.size()) == preamble
 
 
 @pytest.fixture()
@@ -236,12 +397,16 @@ def include_setup(tmpdir):
       'external1/header'),
      (Include('header', False), 'project1', ['external1', 'external2'],
       'external2/header')])
-def test_include_locate(include, cwd, include_dirs, expected, include_setup):
+@pytest.mark.parametrize('indexed', [False, True])
+def test_include_locate(include, cwd, include_dirs, expected, indexed,
+                        include_setup):
     """The search for header locations from include paths."""
     tmpdir, _ = include_setup
     abs_cwd = cppdep.path_normjoin(str(tmpdir), cwd)
     include_dirs = [cppdep.path_normjoin(str(tmpdir), x) for x in include_dirs]
-    hpath, package = include.locate(abs_cwd, include_dirs, [])
+    include.hpath = None
+    isfile = cppdep.FileIndex().isfile if indexed else os.path.isfile
+    hpath, package = include.locate(abs_cwd, include_dirs, [], isfile)
     assert package is None
     assert include.hpath == hpath
     if expected is None:
@@ -251,6 +416,16 @@ def test_include_locate(include, cwd, include_dirs, expected, include_setup):
         assert path_relpath_posix(include.hpath, str(tmpdir)) == expected
 
 
+@pytest.mark.parametrize('path', ['project1/header', 'project1',
+                                  'project1/none', 'none/header',
+                                  'project1/header/none', '.'])
+def test_file_index(path, include_setup):
+    """The file index agrees with the file system."""
+    tmpdir, _ = include_setup
+    path = cppdep.path_normjoin(str(tmpdir), path)
+    assert cppdep.FileIndex().isfile(path) == os.path.isfile(path)
+
+
 @pytest.mark.parametrize(
     'include,cwd,include_patterns,expected',
     [(Include('header_foo', True), '.', [], (None, None)),
@@ -276,6 +451,29 @@ def test_include_locate_pattern(include, cwd, include_patterns, expected,
     assert include.locate(abs_cwd, include_dirs, include_patterns) == expected
 
 
+@pytest.mark.parametrize(
+    'hfile,include_patterns,expected',
+    [('header', [], None),
+     ('header', [('foo', ['head', 'header'])], 'foo'),
+     ('header', [('foo', ['x']), ('bar', ['y', 'h'])], 'bar'),
+     ('header', [('foo', ['(he)ad']), ('bar', ['h'])], 'foo'),
+     ('header', [('foo', ['(he)x']), ('bar', ['h'])], 'bar'),
+     ('header', [('foo', ['x']), ('bar', ['(h)(e)']), ('baz', ['h'])], 'bar'),
+     ('header', [('foo', ['(?i)HEAD']), ('bar', ['h'])], 'foo'),
+     ('header', [('foo', ['(h)\\1']), ('bar', ['x|h$']), ('baz', ['he'])],
+      'baz'),
+     ('header', [('foo', ['x|y']), ('bar', ['x|he'])], 'bar')] +
+    [('h%d' % i, [('p%d' % j, ['h%d$' % j]) for j in range(250)], 'p%d' % i)
+     for i in (0, 98, 99, 100, 198, 249)])
+def test_include_patterns(hfile, include_patterns, expected):
+    """Combined include patterns match as the first matching pattern."""
+    include_patterns = [(x, [re.compile(z) for z in y])
+                        for x, y in include_patterns]
+    assert cppdep.IncludePatterns(include_patterns).match(hfile) == expected
+    assert next((x for x, y in include_patterns
+                 if any(z.match(hfile) for z in y)), None) == expected
+
+
 @pytest.mark.parametrize('hpath,cpath',
                          [('header', None), (None, 'source'),
                           ('header', 'source')])
@@ -323,3 +521,342 @@ def test_package_src_regex(filename, is_header):
         assert src_match.group('h') is not None
     else:
         assert src_match.group('c') is not None
+
+
+def pair_files_quadratic(hpaths, cpaths):
+    """The reference pairing of all the h and c files with the same name."""
+
+    def _num_consecutive_ancestors(file_one, file_two):
+        return sum(1 for _ in itertools.takewhile(
+            lambda x: x[0] == x[1], zip(file_one.rev_path, file_two.rev_path)))
+
+    for filename, hfiles in hpaths.items():
+        hfiles = list(hfiles)
+        candidates = [(x, sorted(((_num_consecutive_ancestors(x, y), y)
+                                  for y in hfiles), reverse=True))
+                      for x in cpaths.pop(filename, [])]
+        candidates.sort(reverse=True, key=lambda x: tuple(y for y, _ in x[1]))
+        for cfile, hfile_candidates in candidates:
+            for _, hfile in hfile_candidates:
+                if hfile in hfiles:
+                    yield hfile.path, cfile.path
+                    hfiles.remove(hfile)
+                    break
+            else:
+                yield None, cfile.path
+        for hfile in hfiles:
+            yield hfile.path, None
+    for cfiles in cpaths.values():
+        for cfile in cfiles:
+            yield None, cfile.path
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_pair_files(seed):
+    """The pairing agrees with the exhaustive comparison of the files."""
+    rng = random.Random(seed)
+    src_file = collections.namedtuple('File', ['rev_path', 'path'])
+    hpaths = collections.defaultdict(list)
+    cpaths = collections.defaultdict(list)
+    for _ in range(rng.randint(1, 60)):
+        name = rng.choice(['types', 'test', 'main'])
+        path = os.path.join(*([os.path.sep] + [
+            rng.choice('abc') for _ in range(rng.randint(0, 4))
+        ] + [name]))
+        src_paths = hpaths if rng.random() < 0.5 else cpaths
+        if any(x.path == path for x in src_paths[name]):
+            continue
+        src_paths[name].append(src_file(path.split(os.path.sep)[::-1], path))
+
+    def _copy(src_paths):
+        return collections.OrderedDict(
+            (x, list(y)) for x, y in sorted(src_paths.items()))
+
+    assert (list(cppdep.Package.pair_files(_copy(hpaths), _copy(cpaths))) ==
+            list(pair_files_quadratic(_copy(hpaths), _copy(cpaths))))
+
+
+@pytest.fixture()
+def project(tmpdir, monkeypatch):
+    """Sets up a small project with its configuration for analysis."""
+    files = {
+        'src/a/x.h': '#include "a/x.h"\n#include <vector>\n',
+        'src/a/x.cc': '#include "x.h"\n#include "y.h"\n',
+        'src/a/y.h': '#include "a/x.h"\n#include <boost/any.hpp>\n',
+        'src/a/y.cc': '#include "y.h"\n',
+        'src/b/z.h': '#include "a/y.h"\n',
+        'src/b/z.cc': '#include "z.h"\n#include <map>\n#include <none.h>\n',
+        'src/b/w.cc': '#include "b/z.h"\n',
+        'ext/inc/boost/any.hpp': '',
+    }
+    for path, text in files.items():
+        tmpdir.join(path).write(text, ensure=True)
+    tmpdir.join('.cppdep.yml').write('\n'.join([
+        'internal:', '  - name: g', '    path: src', '    packages:',
+        '      - name: a', '        src: [a]', '        include: [.]',
+        '      - name: b', '        src: [b]', '        include: [.]',
+        'external:', '  - name: ext', '    path: ext', '    packages:',
+        '      - name: boost', '        include: [inc]',
+        '      - name: std', '        pattern: [vector, map]'
+    ]))
+    monkeypatch.chdir(tmpdir)
+    return tmpdir
+
+
+def run_analysis(analysis, **kwargs):
+    """Runs the analysis and returns the report lines."""
+    args = argparse.Namespace(l=True, L=False, backend='python',
+                              no_dot=False, dot_graph=None, dot_cycles=False,
+                              dot_levels=False)
+    for name, value in kwargs.items():
+        setattr(args, name, value)
+    report = []
+    analysis.analyze(lambda *x: report.append(' '.join(x)), args)
+    return report
+
+
+#pylint: disable=redefined-outer-name
+def test_analysis_jobs(project):
+    """Parallel scanning and analysis report the same as the serial ones."""
+    serial = cppdep.DependencyAnalysis('.cppdep.yml')
+    report = run_analysis(serial)
+    assert 'analyzing dependencies among components in the specified '\
+           'package g.a ...' in report
+    parallel = cppdep.DependencyAnalysis('.cppdep.yml', jobs=2)
+    assert ([(x.hpath, x.cpath) for x in parallel.internal_components] ==
+            [(x.hpath, x.cpath) for x in serial.internal_components])
+    assert run_analysis(parallel) == report
+    assert (run_analysis(parallel, l=False, L=True) ==
+            run_analysis(serial, l=False, L=True))
+
+
+def test_analysis_jobs_diagnostics(project, monkeypatch):
+    """Parallel scanning reports the diagnostics in the serial order."""
+    project.join('src/b/v.h').write('#include <map>\n#include <vector>\n')
+    mock_warn = mock.MagicMock(spec=cppdep.warn)
+    monkeypatch.setattr(cppdep, 'warn', mock_warn)
+    cache = IncludeCache(str(project.join('cache')))
+    warnings = []
+    for jobs in (1, 2):
+        cppdep.DependencyAnalysis('.cppdep.yml',
+                                  include_cache=cache,
+                                  jobs=jobs,
+                                  preamble=True,
+                                  max_preamble_lines=1)
+        warnings.append(mock_warn.call_args_list)
+        mock_warn.reset_mock()
+        project.join('src/a/x.h').write('\n', mode='a')  # A cache miss.
+    assert str(warnings[0]).count('preamble truncated') == 5
+    assert warnings[1] == warnings[0]
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_analysis_profile(project, jobs):
+    """The phases and counters of the analysis are profiled."""
+    profile = Profile()
+    analysis = cppdep.DependencyAnalysis('.cppdep.yml',
+                                         jobs=jobs,
+                                         profile=profile)
+    run_analysis(analysis)
+    phases = ['configuration', 'discovery', 'scanning', 'resolution']
+    if jobs == 1:
+        phases.insert(2, 'pairing')
+    for graph_name in ('g', 'g_a', 'g_b'):
+        phases.extend('graph %s: %s' % (graph_name, x)
+                      for x in ('analysis', 'report', 'dot'))
+    assert list(profile.phases) == phases
+    src_files = project.join('src').visit(fil=lambda x: x.check(file=1))
+    assert profile.counters['files_read'] == 7
+    assert profile.counters['bytes_read'] == sum(x.size() for x in src_files)
+    assert profile.counters['include_directives'] == sum(
+        len(x.includes_in_h) + len(x.includes_in_c)
+        for x in analysis.internal_components)
+    assert (profile.counters['locate_hits'] + profile.counters['locate_misses']
+            == profile.counters['include_directives'])
+    assert profile.counters['file_index_queries'] > 0
+    assert profile.counters['file_index_listings'] > 0
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_analysis_include_cache_diagnostics(project, jobs, monkeypatch):
+    """The scan diagnostics are reported upon the include cache hits."""
+    mock_warn = mock.MagicMock(spec=cppdep.warn)
+    monkeypatch.setattr(cppdep, 'warn', mock_warn)
+    cache = IncludeCache(str(project.join('cache')))
+    warnings = []
+    for _ in range(2):
+        cppdep.DependencyAnalysis('.cppdep.yml',
+                                  include_cache=cache,
+                                  jobs=jobs,
+                                  preamble=True,
+                                  max_preamble_lines=1)
+        warnings.append(mock_warn.call_args_list)
+        mock_warn.reset_mock()
+    assert cache.hits == cache.misses == 7
+    assert 'preamble truncated' in str(warnings[0])
+    assert warnings[1] == warnings[0]
+
+
+def test_analysis_validation_cache(project):
+    """Unchanged valid configurations skip the validation."""
+    cache = ValidationCache(str(project.join('cache')))
+    cppdep.DependencyAnalysis('.cppdep.yml', validation_cache=cache)
+    assert (cache.hits, cache.misses) == (0, 1)
+    cache.save()
+    cache = ValidationCache(str(project.join('cache')))
+    with mock.patch.object(schema, 'validate') as validate:
+        cppdep.DependencyAnalysis('.cppdep.yml', validation_cache=cache)
+    assert not validate.called
+    assert (cache.hits, cache.misses) == (1, 0)
+    project.join('.cppdep.yml').write('\n        license: MIT', mode='a')
+    with pytest.raises(schema.SchemaError):
+        cppdep.DependencyAnalysis('.cppdep.yml', validation_cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert len(cache) == 1
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_analysis_compile_commands(project, jobs):
+    """Implementation files and include directories come from the database."""
+    src_dir = str(project.join('src'))
+    commands = [
+        {'directory': src_dir, 'file': 'a/x.cc',
+         'command': 'c++ -I. -Ib -isystem /usr/include -I../ext/inc -c x.cc'},
+        {'directory': src_dir, 'file': 'a/x.cc', 'command': 'c++ -Iother'},
+        {'directory': src_dir, 'file': 'b/z.cc', 'arguments': ['c++', '-Ib']},
+        {'directory': src_dir, 'file': 'b/z.h', 'arguments': ['c++', '-Ic']},
+        {'directory': src_dir, 'file': '../ext/e.cc', 'command': 'c++ -Ic'},
+    ]
+    project.join('compile_commands.json').write(json.dumps(commands))
+    profile = Profile()
+    analysis = cppdep.DependencyAnalysis(
+        '.cppdep.yml', jobs=jobs, profile=profile,
+        compile_commands='compile_commands.json')
+    assert sorted(
+        (path_relpath_posix(x.hpath, src_dir) if x.hpath else None,
+         path_relpath_posix(x.cpath, src_dir) if x.cpath else None)
+        for x in analysis.internal_components) == [
+            ('a/x.h', 'a/x.cc'), ('a/y.h', None), ('b/z.h', 'b/z.cc')]
+    assert analysis.include_dirs == [  # The group path is in both packages.
+        src_dir, src_dir, os.path.join(src_dir, 'b'),
+        str(project.join('ext', 'inc'))
+    ]
+    assert profile.counters['compile_commands'] == 5
+    assert profile.counters['translation_units'] == 2
+    assert 'compile commands' in profile.phases
+    assert run_analysis(analysis)
+
+
+def test_analysis_compile_commands_malformed(project):
+    """Malformed compilation databases are invalid arguments."""
+    project.join('compile_commands.json').write('[{"file": "a.cc"}]')
+    with pytest.raises(cppdep.InvalidArgumentError):
+        cppdep.DependencyAnalysis('.cppdep.yml',
+                                  compile_commands='compile_commands.json')
+
+
+def test_analysis_locate_memo(project):
+    """Repeated include directives are resolved once."""
+    analysis = cppdep.DependencyAnalysis('.cppdep.yml')
+    num_includes = 0
+    for component in analysis.internal_components:
+        for include in itertools.chain(component.includes_in_h,
+                                       component.includes_in_c):
+            num_includes += 1
+            include_copy = Include(str(include)[1:-1], include.with_quotes)
+            include_copy.locate(component.working_dir, analysis.include_dirs,
+                                [])
+            assert include.hpath == include_copy.hpath
+    assert analysis.locate_hits + analysis.locate_misses == num_includes
+    assert analysis.locate_hits > 0
+
+
+@pytest.mark.parametrize('options,expected', [
+    ({}, ['g.dot', 'g_a.dot', 'g_b.dot']),
+    ({'no_dot': True}, []),
+    ({'dot_graph': ['g_b', 'none']}, ['g_b.dot']),
+    ({'dot_graph': ['g'], 'dot_cycles': True, 'dot_levels': True}, ['g.dot']),
+])
+def test_analysis_dot(project, options, expected):
+    """DOT files are written only for the selected graphs."""
+    analysis = cppdep.DependencyAnalysis('.cppdep.yml')
+    run_analysis(analysis, **options)
+    assert sorted(x.basename for x in project.listdir('*.dot')) == expected
+
+
+@pytest.mark.skipif('scipy' not in BACKENDS, reason='requires SciPy')
+def test_analysis_backend(project):
+    """The SciPy backend reports the same as the Python backend."""
+    analysis = cppdep.DependencyAnalysis('.cppdep.yml')
+    assert (run_analysis(analysis, backend='scipy') ==
+            run_analysis(analysis, backend='python'))
+
+
+def update_analysis(analysis, identities):
+    """Updates the analysis with the changed paths since the identities."""
+    new_identities = analysis.source_identities()
+    return analysis.update([
+        x for x in set(identities).union(new_identities)
+        if identities.get(x) != new_identities.get(x)
+    ])
+
+
+def test_analysis_update_modified(project):
+    """Modified files update only the affected graphs."""
+    analysis = cppdep.DependencyAnalysis('.cppdep.yml')
+    identities = analysis.source_identities()
+    source = project.join('src/a/x.h')
+    stat = os.stat(str(source))
+    os.utime(str(source), (stat.st_atime, stat.st_mtime + 10))
+    assert update_analysis(analysis, identities) == set()
+
+    identities = analysis.source_identities()
+    project.join('src/a/y.cc').write('#include "y.h"\n#include "b/z.h"\n')
+    assert update_analysis(analysis, identities) == set(['g_a', 'g'])
+    assert (run_analysis(analysis) == run_analysis(
+        cppdep.DependencyAnalysis('.cppdep.yml')))
+
+
+def test_analysis_update_added_removed(project):
+    """Added and removed files update components and dependencies."""
+    analysis = cppdep.DependencyAnalysis('.cppdep.yml')
+    identities = analysis.source_identities()
+    project.join('src/b/w.cc').remove()
+    project.join('src/b/z.cc').write(
+        '#include "z.h"\n#include "a/u.h"\n#include <map>\n')
+    project.join('src/b/v/v.cc').write('#include "b/z.h"\n', ensure=True)
+    project.join('src/a/u.h').write('#include <vector>\n')
+    assert update_analysis(analysis, identities) == set(['g_a', 'g_b'])
+    assert ([x.name for x in analysis.internal_components] == [
+        x.name for x in cppdep.DependencyAnalysis(
+            '.cppdep.yml').internal_components
+    ])
+    assert (run_analysis(analysis) == run_analysis(
+        cppdep.DependencyAnalysis('.cppdep.yml')))
+
+
+def test_analysis_update_included_header(project):
+    """Removed and added back headers are located again by includers."""
+    analysis = cppdep.DependencyAnalysis('.cppdep.yml')
+    header = project.join('src/a/y.h')
+    text = header.read()
+    for change in (header.remove, lambda: header.write(text)):
+        identities = analysis.source_identities()
+        change()
+        assert update_analysis(analysis, identities) == set(['g', 'g_a', 'g_b'])
+        assert (run_analysis(analysis) == run_analysis(
+            cppdep.DependencyAnalysis('.cppdep.yml')))
+
+
+def test_lazy_imports():
+    """The slow dependencies are not imported by the entry point."""
+    lazy_modules = ('yaml', 'pykwalify', 'networkx', 'numpy', 'scipy',
+                    'multiprocessing')
+    output = subprocess.check_output(
+        [
+            sys.executable, '-c',
+            'import sys, cppdep.__main__; '
+            'print(sorted(x for x in %r if x in sys.modules))' % (lazy_modules,)
+        ],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(cppdep.__file__))))
+    assert output.decode().strip() == '[]'
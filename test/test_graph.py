@@ -18,51 +18,74 @@
 
 from __future__ import print_function, absolute_import
 
+import random
+
+import networkx as nx
 import pytest
 
 from cppdep import graph
 
 #pylint: disable=redefined-outer-name
 
+class Node(int):
+    """Integer graph node with dependencies."""
+
+    def dependencies(self):
+        """Returns the dependency nodes."""
+        return self.deps
+
+
+def make_graph(edges, nodes=()):
+    """Constructs the dependency graph of integer nodes."""
+    nodes = {x: Node(x) for x in set(nodes).union(*edges)}
+    for node in nodes.values():
+        node.deps = []
+    for u, v in edges:
+        nodes[u].deps.append(nodes[v])
+    return graph.Graph(nodes[x] for x in sorted(nodes))
+
+
 @pytest.fixture()
 def small_graph():
     """A small dependency graph with multiple cycles."""
-    dependency_graph = graph.Graph([])
-    digraph = dependency_graph.digraph
     edges1 = [(1, 2), (2, 4), (2, 6), (6, 2), (6, 7), (7, 6)]
     edges2 = [(1, 3), (1, 5), (3, 4), (3, 5), (3, 8), (8, 9), (9, 3)]
     edges3 = [(10, 11), (10, 12), (11, 12), (12, 11)]
-    digraph.add_edges_from(edges1)
-    digraph.add_edges_from(edges2)
-    digraph.add_edges_from(edges3)
-    return dependency_graph
+    return make_graph(edges1 + edges2 + edges3)
 
 
 def test_graph_init(small_graph):
     """Test the graph creation."""
-    digraph = small_graph.digraph
-    assert set(digraph) == set([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12])
-    assert set(digraph.edges()) == set([(1, 2), (1, 3), (1, 5), (10, 11),
-                                        (10, 12), (11, 12), (12, 11), (2, 4),
-                                        (2, 6), (3, 4), (3, 5), (3, 8), (6, 2),
-                                        (6, 7), (7, 6), (8, 9), (9, 3)])
+    assert set(small_graph.nodes()) == set(
+        [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12])
+    assert set(small_graph.edges()) == set([(1, 2), (1, 3), (1, 5), (10, 11),
+                                            (10, 12), (11, 12), (12, 11),
+                                            (2, 4), (2, 6), (3, 4), (3, 5),
+                                            (3, 8), (6, 2), (6, 7), (7, 6),
+                                            (8, 9), (9, 3)])
+    assert small_graph.number_of_nodes() == 12
+    assert small_graph.number_of_edges() == 17
+    assert set(small_graph.successors(3)) == set([4, 5, 8])
+    digraph = small_graph.to_networkx()
+    assert set(digraph) == set(small_graph.nodes())
+    assert set(digraph.edges()) == set(small_graph.edges())
 
 
-@pytest.fixture()
-def dep_graph(small_graph):
+@pytest.fixture(params=graph.BACKENDS)
+def dep_graph(request, small_graph):
     """Sets up the analyzed graph."""
-    small_graph.analyze()
+    small_graph.analyze(request.param)
     return small_graph
 
 
 def test_graph_minimal(dep_graph):
     """Test the graph after minimization."""
-    digraph = dep_graph.digraph
-    assert set(digraph) == set([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12])
-    assert set(digraph.edges()) == set([(1, 2), (1, 3), (10, 11),
-                                        (10, 12), (11, 12), (12, 11), (2, 4),
-                                        (2, 6), (3, 4), (3, 5), (3, 8), (6, 2),
-                                        (6, 7), (7, 6), (8, 9), (9, 3)])
+    assert set(dep_graph.nodes()) == set(
+        [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12])
+    assert set(dep_graph.edges()) == set([(1, 2), (1, 3), (10, 11), (10, 12),
+                                          (11, 12), (12, 11), (2, 4), (2, 6),
+                                          (3, 4), (3, 5), (3, 8), (6, 2),
+                                          (6, 7), (7, 6), (8, 9), (9, 3)])
 
 
 def test_graph_cycles(dep_graph):
@@ -132,3 +155,215 @@ def test_print_summary(dep_graph, capsys):
                                'Components: 12\t Cycles: 3\t Levels: 5',
                                'CCD: 45\t ACCD: 3.75\t NCCD: 1.25 '
                                '(typical range is [0.85, 1.10])', '']
+
+
+@pytest.mark.parametrize(
+    'cluster_cycles,rank_levels,expected',
+    [(False, False, ['\t"1";', '\t"2";', '\t"4";', '\t"3";']),
+     (True, False, ['\tsubgraph "cluster_0" {', '\t\tlabel="cycle #0";',
+                    '\t\t"2";', '\t\t"3";', '\t}', '\t"1";', '\t"4";']),
+     (False, True, ['\t"1";', '\t"2";', '\t"4";', '\t"3";',
+                    '\t{rank=same; "4";}', '\t{rank=same; "2"; "3";}',
+                    '\t{rank=same; "1";}'])])
+def test_write_dot(cluster_cycles, rank_levels, expected, tmpdir):
+    """Test the DOT output of the reduced graph."""
+    dependency_graph = make_graph([(1, 2), (2, 3), (3, 2), (3, 4), (1, 4)])
+    dependency_graph.analyze()
+    file_basename = str(tmpdir.join('graph'))
+    dependency_graph.write_dot(file_basename, cluster_cycles, rank_levels)
+    assert tmpdir.join('graph.dot').read().split('\n') == (
+        ['strict digraph "graph" {'] + expected + [
+            '\t"1" -> "2";', '\t"2" -> "3";', '\t"3" -> "2";',
+            '\t"3" -> "4";', '}', ''
+        ])
+
+
+@pytest.mark.parametrize('name,expected', [('a', '"a"'), ('a b', '"a b"'),
+                                           ('a"b', r'"a\"b"'),
+                                           ('a\\b', r'"a\\b"')])
+def test_dot_id(name, expected):
+    """Test the quoting of DOT identifiers."""
+    assert graph.dot_id(name) == expected
+
+
+def random_dag(seed, num_nodes=40, probability=0.15, num_back_edges=0):
+    """Returns random directed graph edges with shuffled node order.
+
+    The graph is acyclic unless back edges are requested.
+    """
+    rng = random.Random(seed)
+    nodes = list(range(num_nodes))
+    rng.shuffle(nodes)
+    edges = [(nodes[i], nodes[j]) for i in range(num_nodes)
+             for j in range(i + 1, num_nodes) if rng.random() < probability]
+    for _ in range(num_back_edges):
+        i, j = sorted(rng.sample(range(num_nodes), 2))
+        edges.append((nodes[j], nodes[i]))
+    return nx.DiGraph(edges)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_graph_reduction_random(seed):
+    """Test the transitive reduction of random acyclic graphs."""
+    digraph = random_dag(seed)
+    dependency_graph = make_graph(digraph.edges(), digraph)
+    dependency_graph.analyze()
+    assert set(dependency_graph.edges()) == set(
+        nx.transitive_reduction(digraph).edges())
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_graph_ccd_random(seed):
+    """Test the CD of nodes against their descendants in random graphs."""
+    digraph = random_dag(seed, num_back_edges=seed)
+    dependency_graph = make_graph(digraph.edges(), digraph)
+    dependency_graph.analyze()
+    for node in digraph:
+        cd = dependency_graph.node2cd[dependency_graph.node2cycle.get(
+            node, node)]
+        assert cd == len(nx.descendants(digraph, node) | set([node]))
+
+
+def test_graph_deep_chain():
+    """Test the analysis of chains deeper than the recursion limit."""
+    num_nodes = 5000
+    edges = [(i, i + 1) for i in range(num_nodes - 1)]
+    dependency_graph = make_graph(edges + [(num_nodes - 1, num_nodes - 2)])
+    dependency_graph.analyze()
+    assert dependency_graph.node2level[0] == num_nodes
+    assert dependency_graph.node2cd[0] == num_nodes
+    assert len(dependency_graph.cycles) == 1
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_strongly_connected_components(seed):
+    """Test the components of random graphs against NetworkX."""
+    digraph = random_dag(seed, num_back_edges=2 * seed)
+    nodes = list(digraph)
+    index = {node: i for i, node in enumerate(nodes)}
+    offsets, targets = graph.compressed_rows(
+        len(nodes), [index[u] for u, _ in digraph.edges()],
+        [index[v] for _, v in digraph.edges()])
+    assert [(nodes[i], nodes[j])
+            for i in range(len(nodes))
+            for j in targets[offsets[i]:offsets[i + 1]]] == list(
+                digraph.edges())
+    component, num_components = graph.strongly_connected_components(
+        offsets, targets)
+    expected = list(nx.strongly_connected_components(digraph))
+    assert num_components == len(expected)
+    assert set(frozenset(nodes[i] for i in range(len(nodes))
+                         if component[i] == x)
+               for x in range(num_components)) == set(
+                   frozenset(x) for x in expected)
+    for u, v in digraph.edges():
+        assert component[index[u]] >= component[index[v]]
+
+
+def test_graph_deep_cycle():
+    """Test the condensation of cycles longer than the recursion limit."""
+    num_nodes = 5000
+    edges = [(i, (i + 1) % num_nodes) for i in range(num_nodes)]
+    dependency_graph = make_graph(edges + [(-1, 0)])
+    dependency_graph.analyze()
+    assert len(dependency_graph.cycles) == 1
+    cycle = dependency_graph.cycles[0]
+    assert len(cycle) == num_nodes
+    assert set(cycle.edges()) == set(edges)
+    assert dependency_graph.node2cycle[0] is cycle
+    assert dependency_graph.node2level[-1] == num_nodes + 1
+    assert dependency_graph.node2cd[-1] == num_nodes + 1
+
+
+@pytest.mark.skipif('scipy' not in graph.BACKENDS, reason='requires SciPy')
+@pytest.mark.parametrize('seed', range(10))
+def test_graph_backends_random(seed, monkeypatch):
+    """Test the SciPy backend against the Python backend."""
+    if seed % 2:  # Reachability in multiple blocks of columns.
+        monkeypatch.setattr('cppdep.sparse._BLOCK_BYTES', 64)
+    digraph = random_dag(seed, num_nodes=100, probability=0.1,
+                         num_back_edges=seed)
+    external = set(x for x in digraph if not digraph.out_degree(x))
+
+    def _analyze(backend):
+        nodes = make_graph(digraph.edges(), digraph).nodes()
+        dependency_graph = graph.Graph([x for x in nodes if x not in external],
+                                       is_external=external.__contains__)
+        dependency_graph.analyze(backend)
+        return dependency_graph
+
+    expected = _analyze('python')
+    result = _analyze('scipy')
+    assert set(result.edges()) == set(expected.edges())
+    assert [sorted(x) for x in result.cycles] == [
+        sorted(x) for x in expected.cycles
+    ]
+    for node in digraph:
+        assert (result.node2cd[result.node2cycle.get(node, node)] ==
+                expected.node2cd[expected.node2cycle.get(node, node)])
+        assert result.get_level(node) == expected.get_level(node)
+
+
+def assert_same_analysis(result, expected):
+    """Asserts the same analysis results of two graphs."""
+    assert set(result.edges()) == set(expected.edges())
+    assert result.number_of_edges() == expected.number_of_edges()
+    assert [sorted(x) for x in result.cycles] == [
+        sorted(x) for x in expected.cycles
+    ]
+    assert set(result.cycle2index) == set(result.cycles)
+    for node in expected.nodes():
+        assert (sorted(result.node2cycle.get(node, [node])) == sorted(
+            expected.node2cycle.get(node, [node])))
+        assert (result.node2cd[result.node2cycle.get(node, node)] ==
+                expected.node2cd[expected.node2cycle.get(node, node)])
+        assert result.get_level(node) == expected.get_level(node)
+
+
+@pytest.mark.parametrize('max_fraction', [0, 1])
+@pytest.mark.parametrize('seed', range(10))
+def test_graph_update_edges_random(seed, max_fraction):
+    """Test the incremental analysis against the analysis from scratch."""
+    digraph = random_dag(seed, num_nodes=60, probability=0.05,
+                         num_back_edges=seed % 3)
+    dependency_graph = make_graph(digraph.edges(), digraph)
+    dependency_graph.analyze()
+    rng = random.Random(seed)
+    for _ in range(5):
+        removed_edges = rng.sample(sorted(digraph.edges()), 2)
+        added_edges = []
+        while len(added_edges) < 3:
+            u, v = rng.sample(range(len(digraph) + 2), 2)
+            if not digraph.has_edge(u, v):
+                added_edges.append((u, v))
+                digraph.add_edge(u, v)
+        digraph.remove_edges_from(removed_edges)
+        updated_nodes = dependency_graph.update_edges(
+            added_edges, removed_edges, max_fraction)
+        assert set(u for u, _ in added_edges + removed_edges) <= updated_nodes
+        expected = make_graph(digraph.edges(), digraph)
+        expected.analyze()
+        assert_same_analysis(dependency_graph, expected)
+
+
+@pytest.mark.parametrize('backend', graph.BACKENDS)
+def test_graph_update_edges_cycles(backend):
+    """Test the merge and split of cycles upon edge updates."""
+    edges = [(0, 1), (1, 2), (2, 1), (2, 3), (3, 4), (4, 3), (4, 5), (6, 0)]
+    dependency_graph = make_graph(edges)
+    dependency_graph.analyze(backend)
+    assert len(dependency_graph.cycles) == 2
+    updated_nodes = dependency_graph.update_edges([(3, 1)], max_fraction=1)
+    assert updated_nodes == set([0, 1, 2, 3, 4, 5, 6])
+    assert [sorted(x) for x in dependency_graph.cycles] == [[1, 2, 3, 4]]
+    assert dependency_graph.node2level[6] == 7
+    updated_nodes = dependency_graph.update_edges(
+        [(5, 7)], [(2, 1), (3, 1)], max_fraction=1)
+    assert updated_nodes == set([0, 1, 2, 3, 4, 5, 6, 7])
+    assert [sorted(x) for x in dependency_graph.cycles] == [[3, 4]]
+    assert dependency_graph.node2cd[6] == 8
+    updated_nodes = dependency_graph.update_edges([(9, 8)])
+    assert updated_nodes == set([8, 9])
+    expected = make_graph(edges[:2] + edges[3:] + [(5, 7), (9, 8)])
+    expected.analyze()
+    assert_same_analysis(dependency_graph, expected)
@@ -0,0 +1,77 @@
+# Copyright (C) 2017 Olzhas Rakhimov
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for the profile of the analysis phases."""
+
+from __future__ import absolute_import
+
+import json
+
+from cppdep.profiling import Profile, phase
+
+
+def test_profile_phases():
+    """Repeated phases are accumulated in the order of occurrence."""
+    profile = Profile()
+    for name in ('b', 'a', 'b'):
+        with profile.phase(name):
+            sum(range(1000))
+    assert list(profile.phases) == ['b', 'a']
+    assert [x[2] for x in profile.phases.values()] == [2, 1]
+    assert all(x >= 0 for times in profile.phases.values() for x in times)
+
+
+def test_profile_merge():
+    """Phases of other profiles are merged with the prefix."""
+    profile = Profile()
+    profile.add('a', 1.0, 0.5)
+    other = Profile()
+    other.add('a', 2.0, 1.0)
+    profile.merge(other.phases, 'x: ')
+    profile.merge(other.phases, 'x: ')
+    assert profile.phases == {'a': [1.0, 0.5, 1], 'x: a': [4.0, 2.0, 2]}
+
+
+def test_phase_without_profile():
+    """The timing is skipped without a profile."""
+    with phase(None, 'a'):
+        pass
+    profile = Profile()
+    with phase(profile, 'a'):
+        pass
+    assert list(profile.phases) == ['a']
+
+
+def test_profile_write(tmpdir):
+    """The profile is written in JSON."""
+    profile = Profile()
+    profile.add('a', 1.0, 0.5)
+    profile.count('files_read')
+    profile.count('bytes_read', 10)
+    profile.count('bytes_read', 5)
+    file_path = str(tmpdir.join('profile.json'))
+    profile.write(file_path)
+    with open(file_path) as json_file:
+        result = json.load(json_file)
+    assert result['phases'] == [{
+        'name': 'a',
+        'wall_time': 1.0,
+        'cpu_time': 0.5,
+        'count': 1
+    }]
+    assert result['counters'] == {'files_read': 1, 'bytes_read': 15}
+    assert result['wall_time'] >= 0
+    assert result['cpu_time'] >= 0
+    assert 'peak_memory' in result
@@ -0,0 +1,104 @@
+# Copyright (C) 2017 Olzhas Rakhimov
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for the configuration validation against the schema."""
+
+from __future__ import absolute_import
+
+import logging
+
+import pytest
+import yaml
+
+from cppdep import schema
+
+_PACKAGE = '\n'.join(['internal:', '  - name: g', '    path: src',
+                      '    packages:', '      - name: a'])
+
+_DOCUMENTS = [
+    (_PACKAGE, None),
+    (_PACKAGE + '\n        src: [a, b]\n        include: [.]', None),
+    (_PACKAGE + '\n        src:', None),
+    (_PACKAGE + '\n        src:\n          -', None),
+    (_PACKAGE + '\nexternal:', None),
+    ('internal: []', None),
+    ('internal:\n  - name: g\n    path: src\n    packages: []', None),
+    ('', "Path '/': cannot find required key 'internal'."),
+    ('abc', "Path '/': the value is not a map."),
+    ('internal:', "Path '/': cannot find required key 'internal'."),
+    ('internal:\n  name: g', "Path '/internal': the value is not a sequence."),
+    ('internal:\n  -', "Path '/internal/0': cannot find required key"),
+    (_PACKAGE.replace('name: g', 'name:'),
+     "Path '/internal/0': cannot find required key 'name'."),
+    (_PACKAGE.replace('name: g', 'name: 1'),
+     "Path '/internal/0/name': value '1' is not of type 'str'."),
+    (_PACKAGE.replace('name: g', 'name: true'), "is not of type 'str'."),
+    (_PACKAGE + '\n        src: a',
+     "Path '/internal/0/packages/0/src': the value is not a sequence."),
+    (_PACKAGE + '\n        sources: [a]',
+     "Path '/internal/0/packages/0': key 'sources' is not defined."),
+    (_PACKAGE.replace('internal', 'external'),
+     "Path '/': cannot find required key 'internal'."),
+]
+
+
+@pytest.mark.parametrize('document,error', _DOCUMENTS)
+def test_validate(document, error):
+    """Valid documents pass, and violations are reported with paths."""
+    if error is None:
+        schema.validate(yaml.safe_load(document), schema.load_schema())
+    else:
+        with pytest.raises(schema.SchemaError) as err:
+            schema.validate(yaml.safe_load(document), schema.load_schema())
+        assert error in str(err.value)
+
+
+@pytest.mark.parametrize('document,error', _DOCUMENTS)
+def test_validate_kwalify(document, error, tmpdir):
+    """The validation agrees with PyKwalify on the configuration schema."""
+    core = pytest.importorskip('pykwalify.core')
+    config = tmpdir.join('config.yml')
+    config.write(document)
+    logging.disable(logging.CRITICAL)
+    try:
+        core.Core(str(config), [schema.SCHEMA_FILE]).validate()
+        is_valid = True
+    except Exception:  # pylint: disable=broad-except
+        is_valid = False
+    finally:
+        logging.disable(logging.NOTSET)
+    assert is_valid == (error is None)
+
+
+@pytest.mark.parametrize('rule', [
+    'type: int', 'seq: [{type: str}, {type: str}]', 'type: str\npattern: a',
+    'map: {name: {type: str, unique: True}}'
+])
+def test_load_schema_unsupported(rule, tmpdir):
+    """Schema rules beyond the supported subset are rejected."""
+    schema_file = tmpdir.join('schema.yml')
+    schema_file.write(rule)
+    with pytest.raises(ValueError):
+        schema.load_schema(str(schema_file))
+
+
+def test_digest(tmpdir):
+    """The digest depends on both the document and the schema."""
+    schema_file = tmpdir.join('schema.yml')
+    schema_file.write('type: str')
+    digest = schema.digest(b'internal: []')
+    assert digest == schema.digest(b'internal: []')
+    assert digest != schema.digest(b'internal: [] ')
+    assert digest != schema.digest(b'internal: []', str(schema_file))